@@ -0,0 +1,48 @@
+"""add player_count to rooms
+
+Revision ID: 2d4c81e0f6a5
+Revises: 7b3e9f1c2a40
+Create Date: 2026-10-18 13:41:27.904315
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d4c81e0f6a5'
+down_revision: Union[str, Sequence[str], None] = '7b3e9f1c2a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rooms', sa.Column('player_count', sa.SmallInteger(), nullable=False, server_default='0'))
+
+    # rooms overfilled by concurrent joins would fail the check constraint, they are clamped to their limit
+    overfilled = op.get_bind().execute(sa.text(
+        'SELECT rooms.id, rooms.player_limit, count(*) AS members '
+        'FROM rooms JOIN users_rooms ON users_rooms.room_id = rooms.id '
+        'GROUP BY rooms.id HAVING count(*) > rooms.player_limit'
+    ))
+    for room in overfilled:
+        logger.warning(f'room {room.id} has {room.members} members over a limit of {room.player_limit}')
+
+    op.execute(
+        'UPDATE rooms SET player_count = LEAST(player_limit, '
+        '(SELECT count(*) FROM users_rooms WHERE users_rooms.room_id = rooms.id))'
+    )
+    op.create_check_constraint('check_player_count', 'rooms', 'player_count <= player_limit')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('check_player_count', 'rooms', type_='check')
+    op.drop_column('rooms', 'player_count')
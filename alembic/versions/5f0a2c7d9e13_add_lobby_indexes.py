@@ -0,0 +1,44 @@
+"""add lobby indexes
+
+Revision ID: 5f0a2c7d9e13
+Revises: 2d4c81e0f6a5
+Create Date: 2026-10-18 15:02:51.117093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f0a2c7d9e13'
+down_revision: Union[str, Sequence[str], None] = '2d4c81e0f6a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_rooms_room_id', 'users_rooms', ['room_id'], unique=False)
+    op.create_index(
+        'ix_rooms_lobby',
+        'rooms',
+        ['created_at', 'id'],
+        unique=False,
+        postgresql_where=sa.text("type_ = 'public' AND phase = 'lobby'")
+    )
+    op.create_index(
+        'ix_rooms_lobby_rool_set',
+        'rooms',
+        ['rool_set_id', 'created_at', 'id'],
+        unique=False,
+        postgresql_where=sa.text("type_ = 'public' AND phase = 'lobby'")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_rooms_lobby_rool_set', table_name='rooms')
+    op.drop_index('ix_rooms_lobby', table_name='rooms')
+    op.drop_index('ix_users_rooms_room_id', table_name='users_rooms')
@@ -0,0 +1,36 @@
+"""add game state to rooms
+
+Revision ID: 7b3e9f1c2a40
+Revises: 961a24d1c62a
+Create Date: 2026-10-18 10:12:04.381220
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3e9f1c2a40'
+down_revision: Union[str, Sequence[str], None] = '961a24d1c62a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rooms', sa.Column('phase', sa.String(length=32), nullable=False, server_default='lobby'))
+    op.add_column('users_rooms', sa.Column('game_role_id', sa.Integer(), nullable=True))
+    op.add_column('users_rooms', sa.Column('is_alive', sa.Boolean(), nullable=False, server_default=sa.text('true')))
+    op.create_foreign_key(
+        'users_rooms_game_role_id_fkey', 'users_rooms', 'game_roles', ['game_role_id'], ['id'], ondelete='SET NULL'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('users_rooms_game_role_id_fkey', 'users_rooms', type_='foreignkey')
+    op.drop_column('users_rooms', 'is_alive')
+    op.drop_column('users_rooms', 'game_role_id')
+    op.drop_column('rooms', 'phase')
@@ -0,0 +1,42 @@
+"""add game events
+
+Revision ID: 9c1e6b4a7d28
+Revises: 5f0a2c7d9e13
+Create Date: 2026-10-18 17:26:40.552918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1e6b4a7d28'
+down_revision: Union[str, Sequence[str], None] = '5f0a2c7d9e13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('game_events',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('room_id', sa.Integer(), nullable=False),
+    sa.Column('round', sa.SmallInteger(), nullable=False),
+    sa.Column('phase', sa.String(length=32), nullable=False),
+    sa.Column('event_type', sa.String(length=32), nullable=False),
+    sa.Column('action', sa.String(length=32), nullable=True),
+    sa.Column('actor_id', sa.Integer(), nullable=True),
+    sa.Column('target_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['room_id'], ['rooms.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_game_events_room_id_id', 'game_events', ['room_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_game_events_room_id_id', table_name='game_events')
+    op.drop_table('game_events')
@@ -0,0 +1,318 @@
+"""End-to-end load test of the HTTP API against a disposable Postgres database.
+
+Every simulated room runs the same flow: the creator signs up, logs in and
+creates a room, then the players sign up, log in and join it concurrently,
+and finally every player polls the room details.
+
+    python -m benchmarks.load --rooms 20 --players 8 --polls 10 --output load.json
+    python -m benchmarks.load --transport uvicorn --port 8765
+
+The database server is taken from the DB_* settings. A fresh database is
+created for the run and dropped afterwards unless --keep-database is given.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from uuid import uuid4
+
+
+ENDPOINTS = (
+    'POST /users',
+    'POST /token',
+    'POST /rooms',
+    'POST /rooms/{join_code}',
+    'GET /rooms/{join_code}',
+)
+PASSWORD = 'loadtest123'
+
+
+class Recorder:
+    """Latencies of every request grouped by endpoint template."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {endpoint: [] for endpoint in ENDPOINTS}
+        self.errors: dict[str, int] = {endpoint: 0 for endpoint in ENDPOINTS}
+        self.statuses: dict[str, dict[int, int]] = {endpoint: {} for endpoint in ENDPOINTS}
+
+    async def request(self, client, semaphore: asyncio.Semaphore, endpoint: str, method: str, url: str, **kwargs):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+            except Exception:
+                self.errors[endpoint] += 1
+                raise
+            finally:
+                self.latencies[endpoint].append(time.perf_counter() - started)
+
+        statuses = self.statuses[endpoint]
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if response.is_error:
+            self.errors[endpoint] += 1
+            response.raise_for_status()
+        return response
+
+    def report(self, duration: float) -> dict:
+        endpoints = {}
+        for endpoint, latencies in self.latencies.items():
+            if not latencies:
+                continue
+            latencies = sorted(latencies)
+            endpoints[endpoint] = {
+                'count': len(latencies),
+                'errors': self.errors[endpoint],
+                'statuses': {str(code): count for code, count in sorted(self.statuses[endpoint].items())},
+                'throughput_rps': len(latencies) / duration,
+                'mean_ms': sum(latencies) / len(latencies) * 1000,
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p95_ms': percentile(latencies, 95) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+                'max_ms': latencies[-1] * 1000,
+            }
+
+        total = sum(stats['count'] for stats in endpoints.values())
+        return {
+            'duration_seconds': duration,
+            'requests': total,
+            'errors': sum(stats['errors'] for stats in endpoints.values()),
+            'throughput_rps': total / duration if duration else 0.0,
+            'endpoints': endpoints,
+        }
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    index = max(0, min(len(sorted_values) - 1, round(percent / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+async def sign_in(client, semaphore: asyncio.Semaphore, recorder: Recorder, run_id: str) -> dict:
+    username = f'load_{run_id}_{uuid4().hex[:12]}'
+    await recorder.request(
+        client,
+        semaphore,
+        'POST /users',
+        'POST',
+        '/users',
+        json={
+            'username': username,
+            'email': f'{username}@example.com',
+            'password': PASSWORD,
+            'confirm_password': PASSWORD,
+        }
+    )
+    response = await recorder.request(
+        client,
+        semaphore,
+        'POST /token',
+        'POST',
+        '/token',
+        data={'username': username, 'password': PASSWORD}
+    )
+    return {'Authorization': f'Bearer {response.json()["access_token"]}'}
+
+
+async def room_flow(client, semaphore: asyncio.Semaphore, recorder: Recorder, args, rool_set_id: int, run_id: str):
+    creator = await sign_in(client, semaphore, recorder, run_id)
+    response = await recorder.request(
+        client,
+        semaphore,
+        'POST /rooms',
+        'POST',
+        '/rooms',
+        headers=creator,
+        json={'rool_set_id': rool_set_id, 'player_limit': args.players}
+    )
+    join_code = response.json()['join_code']
+
+    async def player():
+        headers = await sign_in(client, semaphore, recorder, run_id)
+        await recorder.request(
+            client, semaphore, 'POST /rooms/{join_code}', 'POST', f'/rooms/{join_code}', headers=headers
+        )
+        for _ in range(args.polls):
+            await recorder.request(
+                client, semaphore, 'GET /rooms/{join_code}', 'GET', f'/rooms/{join_code}', headers=headers
+            )
+
+    await asyncio.gather(*(player() for _ in range(args.players)))
+
+
+async def create_database(name: str):
+    import asyncpg
+    from src.config import settings
+
+    connection = await asyncpg.connect(
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        database='postgres'
+    )
+    try:
+        await connection.execute(f'CREATE DATABASE "{name}"')
+    finally:
+        await connection.close()
+
+
+async def drop_database(name: str):
+    import asyncpg
+    from src.config import settings
+
+    connection = await asyncpg.connect(
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        database='postgres'
+    )
+    try:
+        await connection.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+    finally:
+        await connection.close()
+
+
+async def prepare_schema() -> int:
+    from src.db import engine, Base, SessionLocal
+    from src.user import models as user_models  # noqa: F401
+    from src.game.models import RoolSet
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    async with SessionLocal() as db:
+        rool_set = RoolSet(name=f'load test {uuid4().hex[:8]}')
+        db.add(rool_set)
+        await db.commit()
+        return rool_set.id
+
+
+async def run_flows(client, args, rool_set_id: int) -> dict:
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    run_id = uuid4().hex[:6]
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(room_flow(client, semaphore, recorder, args, rool_set_id, run_id) for _ in range(args.rooms)),
+        return_exceptions=True
+    )
+    report = recorder.report(time.perf_counter() - started)
+    report['failed_flows'] = sum(isinstance(result, BaseException) for result in results)
+    return report
+
+
+async def run_asgi(args, rool_set_id: int) -> dict:
+    import httpx
+    from src.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://load-test', timeout=args.timeout) as client:
+            return await run_flows(client, args, rool_set_id)
+
+
+async def run_uvicorn(args, rool_set_id: int) -> dict:
+    import httpx
+    import uvicorn
+    from src.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=args.port, log_level='warning'))
+    serving = asyncio.create_task(server.serve())
+    try:
+        while not server.started:
+            if serving.done():
+                serving.result()
+            await asyncio.sleep(0.01)
+
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=f'http://127.0.0.1:{args.port}', timeout=args.timeout, limits=limits
+        ) as client:
+            return await run_flows(client, args, rool_set_id)
+    finally:
+        server.should_exit = True
+        await serving
+
+
+async def main(args) -> dict:
+    database = args.database or f'mafia_load_{uuid4().hex[:8]}'
+    os.environ['DB_NAME'] = database
+    # every simulated player comes from the same address
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+    if not args.database:
+        await create_database(database)
+
+    try:
+        rool_set_id = await prepare_schema()
+        if args.transport == 'uvicorn':
+            report = await run_uvicorn(args, rool_set_id)
+        else:
+            report = await run_asgi(args, rool_set_id)
+    finally:
+        from src.db import engine
+
+        await engine.dispose()
+        if not args.database and not args.keep_database:
+            await drop_database(database)
+
+    report['config'] = {
+        'transport': args.transport,
+        'rooms': args.rooms,
+        'players': args.players,
+        'polls': args.polls,
+        'concurrency': args.concurrency,
+        'python': platform.python_version(),
+    }
+    return report
+
+
+def print_report(report: dict, stream):
+    print(
+        f'{report["requests"]} requests in {report["duration_seconds"]:.2f}s, '
+        f'{report["throughput_rps"]:.1f} req/s, {report["errors"]} errors, {report["failed_flows"]} failed flows',
+        file=stream
+    )
+    print(f'{"endpoint":<26}{"count":>8}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"errors":>8}', file=stream)
+    for endpoint, stats in report['endpoints'].items():
+        print(
+            f'{endpoint:<26}{stats["count"]:>8}{stats["throughput_rps"]:>10.1f}{stats["p50_ms"]:>10.1f}'
+            f'{stats["p95_ms"]:>10.1f}{stats["p99_ms"]:>10.1f}{stats["errors"]:>8}',
+            file=stream
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--transport', choices=('asgi', 'uvicorn'), default='asgi')
+    parser.add_argument('--port', type=int, default=8765, help='port of the local uvicorn server')
+    parser.add_argument('--rooms', type=int, default=10)
+    parser.add_argument('--players', type=int, default=8, help='players joining each room, at most 20')
+    parser.add_argument('--polls', type=int, default=5, help='get_room calls per player after joining')
+    parser.add_argument('--concurrency', type=int, default=50, help='maximum requests in flight')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--database', help='use this existing database instead of a disposable one')
+    parser.add_argument('--keep-database', action='store_true')
+    parser.add_argument('--output', help='write the JSON report to this file, "-" for stdout')
+    args = parser.parse_args(argv)
+
+    from src.game.constants import MIN_PLAYER_LIMIT, MAX_PLAYER_LIMIT
+
+    if not MIN_PLAYER_LIMIT <= args.players <= MAX_PLAYER_LIMIT:
+        parser.error(f'--players must be between {MIN_PLAYER_LIMIT} and {MAX_PLAYER_LIMIT}')
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    report = asyncio.run(main(args))
+    print_report(report, sys.stderr if args.output == '-' else sys.stdout)
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+    elif args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    sys.exit(1 if report['errors'] or report['failed_flows'] else 0)
@@ -0,0 +1,369 @@
+"""Microbenchmarks of the game hot paths with stored baselines.
+
+    python -m benchmarks.micro                     # run and compare with baseline.json
+    python -m benchmarks.micro --save              # record a new baseline
+    python -m benchmarks.micro -k night --output micro.json
+
+Timings are divided by a fixed pure-Python calibration loop measured in the
+same run, so a baseline recorded on one machine stays comparable on another.
+Each timing is the median of --rounds rounds, calls of microsecond-scale
+benchmarks run REPEAT operations so one call is not dominated by timer noise.
+A whole process can run consistently fast or slow, so the suite runs in
+--processes separate processes and each benchmark keeps the median of them.
+The run fails when a benchmark is slower than its baseline by more than
+--tolerance.
+"""
+import argparse
+import gc
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable
+from uuid import UUID
+
+
+SEED = 1234
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+ROOT = Path(__file__).resolve().parent.parent
+ROUND_SECONDS = 0.05
+# operations per call of the benchmarks that take only microseconds
+REPEAT = 100
+
+BENCHMARKS: dict[str, tuple[Callable[[], Callable[[], object]], int]] = {}
+
+
+def bench(name: str, per: int = 1):
+    """Registers a setup function returning the callable to time, per is the number of operations per call."""
+
+    def decorator(setup: Callable[[], Callable[[], object]]):
+        BENCHMARKS[name] = (setup, per)
+        return setup
+
+    return decorator
+
+
+def repeated(func: Callable[[], object]) -> Callable[[], object]:
+    def run():
+        for _ in range(REPEAT):
+            result = func()
+        return result
+
+    return run
+
+
+def rool_set():
+    from src.game.schemas import RoolSetResponse, GameRoleResponse
+
+    return RoolSetResponse(
+        id=1,
+        name='classic',
+        mafia_percent=25,
+        allow_sheriff=True,
+        day_duration_minutes=10,
+        night_duration_minutes=5,
+        game_roles=[
+            GameRoleResponse(id=1, name='mafia', is_mafia=True, is_special=False),
+            GameRoleResponse(id=2, name='sheriff', is_mafia=False, is_special=True),
+            GameRoleResponse(id=3, name='doctor', is_mafia=False, is_special=True),
+            GameRoleResponse(id=4, name='civilian', is_mafia=False, is_special=False),
+        ]
+    )
+
+
+def running_room(rng: random.Random, room_id: int, player_count: int):
+    from src.game.roles import RoleAssigner
+    from src.game.state import RoomState
+    from src.game.enums import GamePhase
+
+    assignment = RoleAssigner(rng.randrange(1 << 30)).assign(rool_set(), player_count)
+    state = RoomState(
+        room_id,
+        str(UUID(int=rng.getrandbits(128), version=4)),
+        1,
+        600,
+        300,
+        [room_id * 100 + seat for seat in range(player_count)],
+        assignment.roles,
+        assignment.abilities,
+        assignment.mafia
+    )
+    state.phase = GamePhase.NIGHT
+    state.round = 1
+    state.deadline = 1_700_000_000.0
+    return state
+
+
+def submit_night_actions(rng: random.Random, state):
+    from src.game.enums import ActionType
+
+    for seat, ability in enumerate(state.abilities):
+        if ability != ActionType.NO_ACTION:
+            state.actions[seat] = (ability, rng.randrange(len(state.user_ids)))
+
+
+for player_count in (4, 8, 12, 16, 20):
+    def setup(player_count=player_count):
+        from src.game.roles import RoleAssigner
+
+        assigner = RoleAssigner(SEED)
+        rules = rool_set()
+        assigner.compositions(rules)
+        return repeated(lambda: assigner.assign(rules, player_count))
+
+    bench(f'role_assignment[{player_count}]', per=REPEAT)(setup)
+
+
+@bench('night_resolution[100 rooms]', per=100)
+def night_resolution():
+    from src.game.resolution import resolve_nights
+
+    rng = random.Random(SEED)
+    states = []
+    for room_id in range(100):
+        state = running_room(rng, room_id, rng.randint(4, 20))
+        submit_night_actions(rng, state)
+        states.append(state)
+    alive = [state.alive for state in states]
+
+    def run():
+        for state, mask in zip(states, alive):
+            state.alive = mask
+        return resolve_nights(states)
+
+    return run
+
+
+@bench('room_tick[100 rooms]', per=100)
+def room_tick():
+    from src.game.engine import GameEngine
+
+    rng = random.Random(SEED)
+    engine = GameEngine()
+    rooms = []
+    for room_id in range(100):
+        state = running_room(rng, room_id, rng.randint(4, 20))
+        submit_night_actions(rng, state)
+        rooms.append((state, state.alive, dict(state.actions)))
+    states = [state for state, _, _ in rooms]
+
+    def run():
+        for state, alive, actions in rooms:
+            state.phase = state.phase.NIGHT
+            state.alive = alive
+            state.winner = None
+            state.actions.update(actions)
+        return engine.advance_many(states)
+
+    return run
+
+
+@bench('vote_tally[1000 ops]', per=1000)
+def vote_tally():
+    from src.game.votes import VoteTally
+
+    rng = random.Random(SEED)
+    operations = [
+        (rng.randrange(20), rng.randrange(20) if rng.random() < 0.85 else None)
+        for _ in range(1000)
+    ]
+    tally = VoteTally()
+
+    def run():
+        tally.clear()
+        for voter, target in operations:
+            if target is None:
+                tally.retract(voter)
+            else:
+                tally.cast(voter, target)
+            tally.leader()
+        return tally.has_majority(20)
+
+    return run
+
+
+@bench('event_serialization[phase_changed]', per=REPEAT)
+def event_serialization():
+    from src.game.hub import encode_event
+    from src.game.service import GameService
+
+    state = running_room(random.Random(SEED), 1, 20)
+    deaths = state.user_ids[:1]
+    return repeated(lambda: encode_event('phase_changed', GameService._phase_event(state, deaths)))
+
+
+@bench('snapshot_encode[20 players]', per=REPEAT)
+def snapshot_encode():
+    from src.game.snapshot import encode_state
+
+    rng = random.Random(SEED)
+    state = running_room(rng, 1, 20)
+    submit_night_actions(rng, state)
+    return repeated(lambda: encode_state(state))
+
+
+@bench('room_detail_response[20 players]', per=REPEAT)
+def room_detail_response():
+    from src.game.service import RoomService
+
+    rng = random.Random(SEED)
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    room = SimpleNamespace(
+        id=1,
+        type_='public',
+        join_code=UUID(int=rng.getrandbits(128), version=4),
+        player_limit=20,
+        player_count=20,
+        users=[SimpleNamespace(id=user_id, username=f'player{user_id}') for user_id in range(20)],
+        created_at=now,
+        updated_at=now
+    )
+    rules = rool_set()
+    return repeated(lambda: RoomService._detail_response(room, rules))
+
+
+def calibration():
+    total = 0
+    for value in range(2000):
+        total += value * value % 7
+    return total
+
+
+def measure(func: Callable[[], object], rounds: int) -> float:
+    """Median time of one call in nanoseconds over several rounds of ROUND_SECONDS each."""
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _measure(func, rounds)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def _measure(func: Callable[[], object], rounds: int) -> float:
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= ROUND_SECONDS:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(ROUND_SECONDS / elapsed) + 1))
+
+    # the median is steadier than the best round, one lucky round no longer sets the result
+    timings = [elapsed / loops]
+    for _ in range(rounds - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        timings.append((time.perf_counter() - started) / loops)
+    return statistics.median(timings) * 1e9
+
+
+def run(pattern: str | None, rounds: int) -> dict:
+    results = {}
+    for name, (setup, per) in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        random.seed(SEED)
+        func = setup()
+        # calibrate right around every benchmark so that drifting clock speed cancels out
+        calibration_ns = measure(calibration, rounds)
+        ns = measure(func, rounds)
+        calibration_ns = (calibration_ns + measure(calibration, rounds)) / 2
+        results[name] = {
+            'ns_per_call': ns,
+            'ns_per_op': ns / per,
+            'relative': ns / calibration_ns,
+        }
+    return {'benchmarks': results}
+
+
+def run_processes(pattern: str | None, rounds: int, processes: int) -> dict:
+    command = [sys.executable, '-m', 'benchmarks.micro', '--single', '--rounds', str(rounds)]
+    if pattern:
+        command += ['-k', pattern]
+    reports = [
+        json.loads(subprocess.run(command, check=True, capture_output=True, text=True, cwd=ROOT).stdout)
+        for _ in range(processes)
+    ]
+
+    results = {}
+    for name in reports[0]['benchmarks']:
+        runs = [report['benchmarks'][name] for report in reports]
+        results[name] = {key: statistics.median(result[key] for result in runs) for key in runs[0]}
+    return {'benchmarks': results}
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, result in report['benchmarks'].items():
+        expected = baseline['benchmarks'].get(name)
+        if expected is None:
+            continue
+        change = result['relative'] / expected['relative'] - 1
+        result['change'] = change
+        if change > tolerance:
+            regressions.append(f'{name} is {change:.0%} slower than the baseline')
+    return regressions
+
+
+def print_report(report: dict, stream):
+    print(f'{"benchmark":<36}{"per call":>14}{"per op":>14}{"change":>10}', file=stream)
+    for name, result in report['benchmarks'].items():
+        change = f'{result["change"]:+.0%}' if 'change' in result else '-'
+        print(
+            f'{name:<36}{result["ns_per_call"] / 1000:>11.2f} us{result["ns_per_op"] / 1000:>11.2f} us{change:>10}',
+            file=stream
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('-k', dest='pattern', help='only run benchmarks whose name contains this text')
+    parser.add_argument('--rounds', type=int, default=7)
+    parser.add_argument('--processes', type=int, default=3, help='separate runs to take the median of')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed slowdown, 0.5 is 50%%')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--output', help='write the JSON report to this file, "-" for stdout')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.single:
+        # one run for run_processes, the report is read from stdout
+        json.dump(run(args.pattern, args.rounds), sys.stdout)
+        sys.exit(0)
+
+    if args.processes > 1:
+        report = run_processes(args.pattern, args.rounds, args.processes)
+    else:
+        report = run(args.pattern, args.rounds)
+
+    regressions = []
+    if args.save:
+        args.baseline.write_text(json.dumps(report, indent=2) + '\n')
+    elif args.baseline.exists():
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+
+    stream = sys.stderr if args.output == '-' else sys.stdout
+    print_report(report, stream)
+    for regression in regressions:
+        print(f'REGRESSION: {regression}', file=stream)
+
+    report['regressions'] = regressions
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+    elif args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,162 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable
+from loguru import logger
+from src.config import settings
+
+
+Handler = Callable[[str, list[str]], Awaitable[None]]
+
+RECONNECT_MIN_SECONDS = 0.5
+RECONNECT_MAX_SECONDS = 30
+
+
+class EventBus(ABC):
+    """Pub/sub bus for pre-encoded messages.
+
+    Publishes are buffered per channel and flushed once per event-loop tick,
+    so a burst of events for one room costs a single delivery.
+    """
+
+    def __init__(self):
+        self._handlers: list[Handler] = []
+        self._pending: dict[str, list[str]] = {}
+        self._flush_scheduled = False
+        self._flushes: set[asyncio.Task] = set()
+
+    def subscribe(self, handler: Handler):
+        self._handlers.append(handler)
+
+    def publish(self, channel: str, message: str):
+        pending = self._pending.get(channel)
+        if pending is None:
+            self._pending[channel] = [message]
+        else:
+            pending.append(message)
+
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        if self._pending:
+            self._flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def _flush(self):
+        batch, self._pending = self._pending, {}
+        self._flush_scheduled = False
+
+        task = asyncio.create_task(self._send(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    @abstractmethod
+    async def _send(self, batch: dict[str, list[str]]):
+        """Delivers one flushed batch of messages per channel."""
+
+    async def _dispatch(self, channel: str, messages: list[str]):
+        for handler in self._handlers:
+            try:
+                await handler(channel, messages)
+            except Exception:
+                logger.exception(f'event handler failed for channel {channel}')
+
+
+class MemoryEventBus(EventBus):
+
+    async def _send(self, batch: dict[str, list[str]]):
+        for channel, messages in batch.items():
+            await self._dispatch(channel, messages)
+
+
+class RedisEventBus(EventBus):
+    """Messages of one batch are joined with newlines into a single Redis PUBLISH per channel.
+
+    A dropped subscription is logged and reopened with exponential backoff,
+    messages published while it is down are lost.
+    """
+
+    def __init__(self, url: str, prefix: str):
+        super().__init__()
+        self._url = url
+        self._prefix = prefix
+        self._redis = None
+        self._pubsub = None
+        self._listener: asyncio.Task | None = None
+
+    async def start(self):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(self._url)
+        await self._subscribe()
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        await super().stop()
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        if self._redis is not None:
+            await self._redis.aclose()
+
+    async def _send(self, batch: dict[str, list[str]]):
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for channel, messages in batch.items():
+                    pipe.publish(f'{self._prefix}{channel}', '\n'.join(messages))
+                await pipe.execute()
+        except Exception:
+            logger.exception(f'failed to publish events for {len(batch)} channels')
+
+    async def _subscribe(self):
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.psubscribe(f'{self._prefix}*')
+
+    async def _unsubscribe(self):
+        pubsub, self._pubsub = self._pubsub, None
+        try:
+            await pubsub.aclose()
+        except Exception:
+            pass
+
+    async def _listen(self):
+        prefix_length = len(self._prefix)
+        delay = RECONNECT_MIN_SECONDS
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._subscribe()
+                    logger.info('event bus subscription restored')
+                async for message in self._pubsub.listen():
+                    delay = RECONNECT_MIN_SECONDS
+                    if message['type'] != 'pmessage':
+                        continue
+                    channel = message['channel'].decode()[prefix_length:]
+                    await self._dispatch(channel, message['data'].decode().split('\n'))
+                logger.warning(f'event bus subscription ended, reconnecting in {delay:.1f}s')
+            except Exception:
+                logger.exception(f'event bus subscription failed, reconnecting in {delay:.1f}s')
+
+            if self._pubsub is not None:
+                await self._unsubscribe()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+
+def create_event_bus() -> EventBus:
+    if settings.EVENT_BUS_BACKEND == 'redis':
+        return RedisEventBus(settings.REDIS_URL, settings.EVENT_BUS_CHANNEL_PREFIX)
+    return MemoryEventBus()
+
+
+event_bus = create_event_bus()
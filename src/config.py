@@ -7,10 +7,81 @@ class Settings(BaseSettings):
     DB_PASSWORD: str = 'mafia_password'
     DB_HOST: str = '127.0.0.1'
     DB_PORT: int = 5432
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 10
+    DB_POOL_PRE_PING: bool = False
+    # seconds before a connection is replaced, -1 keeps connections forever
+    DB_POOL_RECYCLE: int = 1800
+    # prepared statements cached per connection, set to 0 behind pgbouncer in transaction mode
+    DB_STATEMENT_CACHE_SIZE: int = 100
+
+    # development aid: per-request query counts in X-DB-* headers and logs, repeated statements are flagged
+    SQL_DEBUG: bool = False
+    SQL_REPEAT_THRESHOLD: int = 3
 
     SECRET_KEY: str = 'secret_key'
     ALGORITHM: str = 'HS256'
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 120
 
+    # the first scheme hashes new passwords, hashes of the others are upgraded on the next login
+    PASSWORD_SCHEMES: str = 'bcrypt'
+    # stored bcrypt hashes with other rounds are rehashed on the next login
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+
+    # token buckets in front of bcrypt work, 'memory' per process or 'redis' shared by all workers
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = 'memory'
+    RATE_LIMIT_KEY_PREFIX: str = 'mafia:rate:'
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_IP_PER_MINUTE: float = 30
+    RATE_LIMIT_IP_BURST: int = 10
+    RATE_LIMIT_USERNAME_PER_MINUTE: float = 10
+    RATE_LIMIT_USERNAME_BURST: int = 5
+    # failed logins of one username from any address, successful logins do not count
+    RATE_LIMIT_LOGIN_FAILURES_PER_MINUTE: float = 10
+    RATE_LIMIT_LOGIN_FAILURES_BURST: int = 20
+
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 60
+
+    ROOM_CACHE_SIZE: int = 10000
+    ROOM_CACHE_TTL_SECONDS: float = 30
+
+    EVENT_STORE_MAX_BUFFER: int = 100000
+    EVENT_STORE_FLUSH_SIZE: int = 1000
+    EVENT_STORE_FLUSH_INTERVAL_SECONDS: float = 1
+
+    # fixed seed makes role assignment reproducible, leave empty in production
+    GAME_RNG_SEED: int | None = None
+
+    REDIS_HOST: str = '127.0.0.1'
+    REDIS_PORT: int = 6379
+    REDIS_DB: int = 0
+
+    # 'memory' for single-process runs, 'redis' when several workers serve the same rooms
+    EVENT_BUS_BACKEND: str = 'memory'
+    EVENT_BUS_CHANNEL_PREFIX: str = 'mafia:'
+
+    # rooms are sharded across the workers listed as 'id=http://host:port,...', empty runs everything locally
+    WORKER_ID: str = ''
+    SHARD_NODES: str = ''
+    SHARD_VIRTUAL_NODES: int = 128
+    SHARD_PROXY_TIMEOUT_SECONDS: float = 10
+
+    @property
+    def SHARD_NODE_URLS(self) -> dict[str, str]:
+        nodes = {}
+        for node in filter(None, (item.strip() for item in self.SHARD_NODES.split(','))):
+            node_id, _, url = node.partition('=')
+            nodes[node_id.strip()] = url.strip().rstrip('/')
+        return nodes
+
+    @property
+    def REDIS_URL(self) -> str:
+        return f'redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}'
+
 
 settings = Settings()
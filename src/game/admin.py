@@ -1,10 +1,25 @@
+from typing import Any
 from sqladmin import ModelView
+from starlette.requests import Request
 from .models import RoolSet, GameRole
+from .cache import rool_set_cache
 
 
 class RoolSetAdminView(ModelView, model=RoolSet):
     column_list = [RoolSet.id, RoolSet.name]
 
+    async def after_model_change(self, data: dict, model: Any, is_created: bool, request: Request) -> None:
+        rool_set_cache.invalidate(model.id)
+
+    async def after_model_delete(self, model: Any, request: Request) -> None:
+        rool_set_cache.invalidate(model.id)
+
 
 class GameRoleAdminView(ModelView, model=GameRole):
     column_list = [GameRole.id, GameRole.name, GameRole.is_special]
+
+    async def after_model_change(self, data: dict, model: Any, is_created: bool, request: Request) -> None:
+        rool_set_cache.invalidate()
+
+    async def after_model_delete(self, model: Any, request: Request) -> None:
+        rool_set_cache.invalidate()
@@ -0,0 +1,140 @@
+import time
+from collections import OrderedDict
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.bus import event_bus
+from src.config import settings
+from .models import RoolSet
+from .schemas import RoomDetailResponse, RoolSetResponse, GameRoleResponse
+
+
+class RoomDetailCache:
+    """Bounded LRU of room detail responses keyed by join_code.
+
+    Entries expire after a short TTL and are dropped explicitly whenever an
+    event is published for the room, on this or any other worker.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, RoomDetailResponse, frozenset[int]]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, join_code: str) -> tuple[RoomDetailResponse, frozenset[int]] | None:
+        key = join_code.lower()
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, response, member_ids = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return response, member_ids
+
+    def set(self, join_code: str, response: RoomDetailResponse, member_ids: frozenset[int]):
+        key = join_code.lower()
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, response, member_ids)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, join_code: str):
+        self._entries.pop(join_code.lower(), None)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def handle_event(self, channel: str, messages: list[str]):
+        kind, _, target = channel.partition(':')
+        if kind == 'room' and ':' not in target:
+            self.invalidate(target)
+
+
+ROOL_SETS_CHANNEL = 'rool_sets'
+
+
+class RoolSetCache:
+    """In-process copy of every rool set with its game roles.
+
+    Loaded once at startup and read through on a miss. Admin edits drop the
+    affected entries here and, through the event bus, on every other worker.
+    """
+
+    def __init__(self):
+        self._rool_sets: dict[int, RoolSetResponse] = {}
+
+    def __len__(self) -> int:
+        return len(self._rool_sets)
+
+    async def load(self, db: AsyncSession):
+        query = select(RoolSet).options(selectinload(RoolSet.game_roles))
+        result = await db.execute(query)
+        self._rool_sets = {rool_set.id: self._to_response(rool_set) for rool_set in result.scalars()}
+
+    async def get(self, rool_set_id: int, db: AsyncSession) -> RoolSetResponse | None:
+        rool_set = self._rool_sets.get(rool_set_id)
+        if rool_set is not None:
+            return rool_set
+
+        query = (
+            select(RoolSet)
+            .options(selectinload(RoolSet.game_roles))
+            .where(RoolSet.id == rool_set_id)
+        )
+        result = await db.execute(query)
+        instance = result.scalar_one_or_none()
+        if instance is None:
+            return None
+
+        rool_set = self._to_response(instance)
+        self._rool_sets[rool_set_id] = rool_set
+        return rool_set
+
+    def invalidate(self, rool_set_id: int | None = None):
+        self._drop(rool_set_id)
+        event_bus.publish(ROOL_SETS_CHANNEL, '*' if rool_set_id is None else str(rool_set_id))
+
+    def _drop(self, rool_set_id: int | None):
+        if rool_set_id is None:
+            self._rool_sets.clear()
+        else:
+            self._rool_sets.pop(rool_set_id, None)
+        room_detail_cache.clear()
+
+    async def handle_event(self, channel: str, messages: list[str]):
+        if channel != ROOL_SETS_CHANNEL:
+            return
+        for message in messages:
+            self._drop(None if message == '*' else int(message))
+
+    @staticmethod
+    def _to_response(rool_set: RoolSet) -> RoolSetResponse:
+        return RoolSetResponse(
+            id=rool_set.id,
+            name=rool_set.name,
+            mafia_percent=rool_set.mafia_percent,
+            allow_sheriff=rool_set.allow_sheriff,
+            day_duration_minutes=rool_set.day_duration_minutes,
+            night_duration_minutes=rool_set.night_duration_minutes,
+            game_roles=[
+                GameRoleResponse(
+                    id=gr.id,
+                    name=gr.name,
+                    is_mafia=gr.is_mafia,
+                    is_special=gr.is_special
+                )
+                for gr in rool_set.game_roles
+            ]
+        )
+
+
+room_detail_cache = RoomDetailCache(settings.ROOM_CACHE_SIZE, settings.ROOM_CACHE_TTL_SECONDS)
+rool_set_cache = RoolSetCache()
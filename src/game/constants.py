@@ -3,3 +3,9 @@ MIN_PLAYER_LIMIT = 4
 MAX_PLAYER_LIMIT = 20
 MIN_DAY_DURATION_MINUTES = 3
 MIN_NIGHT_DURATION_MINUTES = 3
+SHERIFF_ROLE_NAME = 'sheriff'
+DOCTOR_ROLE_NAME = 'doctor'
+DEFAULT_LOBBY_PAGE_SIZE = 20
+MAX_LOBBY_PAGE_SIZE = 100
+QUICK_JOIN_CANDIDATES = 5
+PHASE_WRITE_RETRY_SECONDS = 1
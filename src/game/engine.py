@@ -0,0 +1,146 @@
+import time
+from .enums import GamePhase, GameWinner, ActionType
+from .exceptions import GameActionException
+from .state import RoomState, PhaseResult
+from .resolution import resolve_nights, resolve_day
+
+
+class GameEngine:
+
+    def __init__(self):
+        self._rooms: dict[str, RoomState] = {}
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def __contains__(self, join_code: str) -> bool:
+        return join_code in self._rooms
+
+    def get(self, join_code: str) -> RoomState | None:
+        return self._rooms.get(join_code)
+
+    def states(self) -> list[RoomState]:
+        return list(self._rooms.values())
+
+    def add(self, state: RoomState):
+        if state.join_code in self._rooms:
+            raise GameActionException('Game has already started')
+        self._rooms[state.join_code] = state
+
+    def remove(self, join_code: str) -> RoomState | None:
+        return self._rooms.pop(join_code, None)
+
+    def start(self, state: RoomState) -> PhaseResult:
+        self.add(state)
+        return self._enter_phase(state, GamePhase.NIGHT)
+
+    def submit_action(self, state: RoomState, user_id: int, action: ActionType, target_id: int | None):
+        if state.phase != GamePhase.NIGHT:
+            raise GameActionException('Actions can only be submitted at night')
+
+        seat = state.seat_of(user_id)
+        if not state.is_alive(seat):
+            raise GameActionException('Dead players cannot act')
+
+        if action == ActionType.NO_ACTION:
+            state.actions.pop(seat, None)
+            return
+
+        if state.abilities[seat] != action:
+            raise GameActionException(f'Your role cannot perform {action.value}')
+        if target_id is None:
+            raise GameActionException('Action requires a target')
+
+        target = state.seat_of(target_id)
+        if not state.is_alive(target):
+            raise GameActionException('Target is already dead')
+
+        state.actions[seat] = (action, target)
+
+    def cast_vote(self, state: RoomState, user_id: int, target_id: int | None):
+        if state.phase != GamePhase.DAY:
+            raise GameActionException('Votes can only be cast during the day')
+
+        seat = state.seat_of(user_id)
+        if not state.is_alive(seat):
+            raise GameActionException('Dead players cannot vote')
+
+        if target_id is None:
+            state.tally.retract(seat)
+            return
+
+        target = state.seat_of(target_id)
+        if not state.is_alive(target):
+            raise GameActionException('Target is already dead')
+
+        state.tally.cast(seat, target)
+
+    @staticmethod
+    def voting_complete(state: RoomState) -> bool:
+        alive_count = state.alive_count
+        return len(state.tally) >= alive_count or state.tally.has_majority(alive_count)
+
+    @staticmethod
+    def all_actions_submitted(state: RoomState) -> bool:
+        for seat, ability in enumerate(state.abilities):
+            if ability != ActionType.NO_ACTION and state.alive >> seat & 1 and seat not in state.actions:
+                return False
+        return True
+
+    def advance_many(self, states: list[RoomState]) -> list[PhaseResult]:
+        """Ends the current phase of every given room, nights are resolved together in one batch."""
+        night_results = iter(resolve_nights([state for state in states if state.phase == GamePhase.NIGHT]))
+
+        results = []
+        for state in states:
+            if state.phase == GamePhase.NIGHT:
+                result = next(night_results)
+            elif state.phase == GamePhase.DAY:
+                result = resolve_day(state)
+            else:
+                result = PhaseResult(state, state.phase)
+
+            winner = self._check_winner(state)
+            if winner is not None:
+                state.winner = winner
+                self._set_phase(state, GamePhase.FINISHED)
+            elif state.phase == GamePhase.NIGHT:
+                self._set_phase(state, GamePhase.DAY)
+            else:
+                self._set_phase(state, GamePhase.NIGHT)
+
+            results.append(result)
+        return results
+
+    def _enter_phase(self, state: RoomState, phase: GamePhase) -> PhaseResult:
+        result = PhaseResult(state, state.phase)
+        self._set_phase(state, phase)
+        return result
+
+    @staticmethod
+    def _set_phase(state: RoomState, phase: GamePhase):
+        state.phase = phase
+        state.actions.clear()
+        state.tally.clear()
+
+        if phase == GamePhase.NIGHT:
+            state.round += 1
+            state.deadline = time.time() + state.night_duration
+        elif phase == GamePhase.DAY:
+            state.deadline = time.time() + state.day_duration
+        else:
+            state.deadline = 0.0
+
+    @staticmethod
+    def _check_winner(state: RoomState) -> GameWinner | None:
+        mafia_alive = (state.alive & state.mafia).bit_count()
+        town_alive = (state.alive & ~state.mafia).bit_count()
+
+        if mafia_alive == 0:
+            return GameWinner.TOWN
+        if mafia_alive >= town_alive:
+            return GameWinner.MAFIA
+        return None
+
+
+game_engine = GameEngine()
@@ -16,3 +16,23 @@ class ActionType(str, enum.Enum):
     KILL = 'kill'
     SAVE = 'save'
     INVESTIGATE = 'investigate'
+
+
+class GamePhase(str, enum.Enum):
+    LOBBY = 'lobby'
+    NIGHT = 'night'
+    DAY = 'day'
+    FINISHED = 'finished'
+
+
+class GameWinner(str, enum.Enum):
+    MAFIA = 'mafia'
+    TOWN = 'town'
+
+
+class GameEventType(str, enum.Enum):
+    GAME_STARTED = 'game_started'
+    ACTION = 'action'
+    VOTE = 'vote'
+    PHASE_CHANGED = 'phase_changed'
+    DEATH = 'death'
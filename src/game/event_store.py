@@ -0,0 +1,161 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+import asyncpg
+from loguru import logger
+from sqlalchemy import exc
+from src.config import settings
+from src.db import engine
+from .enums import GameEventType, GamePhase
+from .state import RoomState
+
+
+COLUMNS = ('room_id', 'round', 'phase', 'event_type', 'action', 'actor_id', 'target_id', 'created_at')
+
+# the database could not be reached, the same records are written again later
+TRANSIENT_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+    exc.OperationalError,
+    exc.InterfaceError,
+)
+
+
+class GameEventStore:
+    """Write-behind buffer for game events.
+
+    Events are appended in memory and copied to game_events in bulk once the
+    buffer reaches flush_size or every flush_interval seconds. The buffer is
+    bounded by max_buffer, events beyond it are dropped and counted.
+
+    Records are put back only when the database cannot be reached. Events of
+    rooms deleted in the meantime are filtered out, a batch that still cannot
+    be written is dropped.
+    """
+
+    def __init__(self, max_buffer: int, flush_size: int, flush_interval: float):
+        self.max_buffer = max_buffer
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._buffer: list[tuple] = []
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._flushes: set[asyncio.Task] = set()
+        self._retry_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def record(
+        self,
+        state: RoomState,
+        event_type: GameEventType,
+        action: str | None = None,
+        actor_id: int | None = None,
+        target_id: int | None = None,
+        phase: GamePhase | None = None,
+        round_: int | None = None
+    ):
+        if len(self._buffer) >= self.max_buffer:
+            self.dropped += 1
+            return
+
+        self._buffer.append((
+            state.room_id,
+            state.round if round_ is None else round_,
+            (phase or state.phase).value,
+            event_type.value,
+            action,
+            actor_id,
+            target_id,
+            datetime.now(timezone.utc)
+        ))
+        # a failed flush re-queues its records, so the buffer may already be past flush_size,
+        # size triggered flushes then wait for flush_interval instead of retrying on every event
+        if len(self._buffer) >= self.flush_size and not self._flushes and time.monotonic() >= self._retry_at:
+            task = asyncio.create_task(self.flush())
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            records, self._buffer = self._buffer, []
+            if not records:
+                return
+
+            try:
+                async with engine.connect() as conn:
+                    raw_connection = await conn.get_raw_connection()
+                    connection = raw_connection.driver_connection
+                    try:
+                        await self._copy(connection, records)
+                    except asyncpg.IntegrityConstraintViolationError:
+                        records = await self._of_existing_rooms(connection, records)
+                        await self._copy(connection, records)
+                self.written += len(records)
+            except TRANSIENT_ERRORS:
+                logger.exception(f'failed to write {len(records)} game events')
+                self._retry_at = time.monotonic() + self.flush_interval
+                self._requeue(records)
+            except Exception:
+                logger.exception(f'dropped {len(records)} game events that cannot be written')
+                self.dropped += len(records)
+
+    @staticmethod
+    async def _copy(connection: asyncpg.Connection, records: list[tuple]):
+        if records:
+            await connection.copy_records_to_table('game_events', records=records, columns=COLUMNS)
+
+    async def _of_existing_rooms(self, connection: asyncpg.Connection, records: list[tuple]) -> list[tuple]:
+        room_ids = list({record[0] for record in records})
+        rows = await connection.fetch('SELECT id FROM rooms WHERE id = ANY($1::int[])', room_ids)
+        existing = {row[0] for row in rows}
+        kept = [record for record in records if record[0] in existing]
+        if len(kept) < len(records):
+            self.dropped += len(records) - len(kept)
+            logger.warning(f'dropped {len(records) - len(kept)} game events of deleted rooms')
+        return kept
+
+    def _requeue(self, records: list[tuple]):
+        """Puts failed records back in front of the buffer, the oldest are dropped past max_buffer."""
+        free = max(0, self.max_buffer - len(self._buffer))
+        kept = records[-free:] if free else []
+        self._buffer[:0] = kept
+        if len(kept) < len(records):
+            self.dropped += len(records) - len(kept)
+            logger.warning(f'dropped {len(records) - len(kept)} game events, the buffer is full')
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception('game event flush failed')
+
+
+game_event_store = GameEventStore(
+    settings.EVENT_STORE_MAX_BUFFER,
+    settings.EVENT_STORE_FLUSH_SIZE,
+    settings.EVENT_STORE_FLUSH_INTERVAL_SECONDS
+)
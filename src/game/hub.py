@@ -0,0 +1,119 @@
+import asyncio
+import json
+from fastapi import WebSocket, status
+from loguru import logger
+from src.bus import event_bus
+
+
+SEND_TIMEOUT_SECONDS = 5
+# messages waiting for one websocket, a client this far behind is disconnected
+SEND_QUEUE_SIZE = 256
+
+
+def encode_event(event: str, data: dict) -> str:
+    return json.dumps({'event': event, 'data': data}, separators=(',', ':'))
+
+
+class Subscriber:
+    """Websocket of a room with its own outgoing queue, drained by a writer task."""
+
+    __slots__ = ('websocket', 'user_id', 'queue', 'writer')
+
+    def __init__(self, websocket: WebSocket, user_id: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue[str] = asyncio.Queue(SEND_QUEUE_SIZE)
+        self.writer: asyncio.Task | None = None
+
+
+class RoomHub:
+    """Keeps the websockets subscribed to each room on this worker.
+
+    Events are encoded once, published through the event bus and the same
+    text frame is queued for every local subscriber of the room. Delivery only
+    queues, each socket is written by its own task, so a slow client never holds
+    up the bus. Sockets that fall behind or time out are closed.
+    """
+
+    def __init__(self):
+        self._rooms: dict[str, dict[WebSocket, Subscriber]] = {}
+        self._closing: set[asyncio.Task] = set()
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(sockets) for sockets in self._rooms.values())
+
+    @property
+    def room_count(self) -> int:
+        return len(self._rooms)
+
+    def subscribe(self, join_code: str, user_id: int, websocket: WebSocket):
+        subscriber = Subscriber(websocket, user_id)
+        subscriber.writer = asyncio.create_task(self._write(join_code, subscriber))
+        self._rooms.setdefault(join_code, {})[websocket] = subscriber
+
+    def unsubscribe(self, join_code: str, websocket: WebSocket):
+        sockets = self._rooms.get(join_code)
+        if sockets is None:
+            return
+        subscriber = sockets.pop(websocket, None)
+        if not sockets:
+            del self._rooms[join_code]
+        if subscriber is not None and subscriber.writer is not asyncio.current_task():
+            subscriber.writer.cancel()
+
+    def publish(self, join_code: str, event: str, data: dict):
+        event_bus.publish(f'room:{join_code}', encode_event(event, data))
+
+    def publish_to_user(self, join_code: str, user_id: int, event: str, data: dict):
+        event_bus.publish(f'room:{join_code}:{user_id}', encode_event(event, data))
+
+    async def deliver(self, channel: str, messages: list[str]):
+        kind, _, target = channel.partition(':')
+        if kind != 'room':
+            return
+
+        join_code, _, user_id = target.partition(':')
+        sockets = self._rooms.get(join_code)
+        if not sockets:
+            return
+
+        if user_id:
+            user_id = int(user_id)
+            targets = [subscriber for subscriber in sockets.values() if subscriber.user_id == user_id]
+        else:
+            targets = list(sockets.values())
+
+        for subscriber in targets:
+            try:
+                for message in messages:
+                    subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._drop(join_code, subscriber, 'too many unsent messages')
+
+    async def _write(self, join_code: str, subscriber: Subscriber):
+        while True:
+            message = await subscriber.queue.get()
+            try:
+                await asyncio.wait_for(subscriber.websocket.send_text(message), SEND_TIMEOUT_SECONDS)
+            except Exception as exc:
+                self._drop(join_code, subscriber, repr(exc))
+                return
+
+    def _drop(self, join_code: str, subscriber: Subscriber, reason: str):
+        logger.warning(f'dropping websocket in room {join_code}: {reason}')
+        self.unsubscribe(join_code, subscriber.websocket)
+        task = asyncio.create_task(self._close(subscriber.websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(status.WS_1013_TRY_AGAIN_LATER), SEND_TIMEOUT_SECONDS)
+        except Exception:
+            # already gone or not answering, the server drops the connection
+            pass
+
+
+room_hub = RoomHub()
@@ -0,0 +1,136 @@
+import heapq
+import itertools
+import json
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import Room
+from .enums import RoomType, GamePhase
+
+
+# start of the room_created event as encoded by hub.encode_event
+ROOM_CREATED_PREFIX = '{"event":"room_created"'
+
+
+class FillIndex:
+    """Open public lobby rooms ordered by fill level, fullest first.
+
+    Every room is pushed into a global heap and the heap of its rool set.
+    Updates push a new versioned entry, outdated entries are discarded lazily
+    and a heap is rebuilt once it holds more than twice its live rooms.
+    Rooms created on other workers are added from their room_created events.
+    """
+
+    def __init__(self):
+        self._rooms: dict[str, tuple[int, int, int, int]] = {}
+        self._heaps: dict[int | None, list[tuple[int, int, str]]] = {}
+        self._sizes: dict[int, int] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def __contains__(self, join_code: str) -> bool:
+        return join_code in self._rooms
+
+    async def load(self, db: AsyncSession):
+        query = (
+            select(Room.join_code, Room.rool_set_id, Room.player_count, Room.player_limit)
+            .where(
+                Room.type_ == RoomType.PUBLIC.value,
+                Room.phase == GamePhase.LOBBY.value,
+                Room.player_count < Room.player_limit
+            )
+        )
+        result = await db.execute(query)
+        for row in result:
+            self.update(str(row.join_code), row.rool_set_id, row.player_count, row.player_limit)
+
+    def update(self, join_code: str, rool_set_id: int, player_count: int, player_limit: int):
+        if player_count >= player_limit:
+            self.remove(join_code)
+            return
+
+        if join_code not in self._rooms:
+            self._sizes[rool_set_id] = self._sizes.get(rool_set_id, 0) + 1
+        version = next(self._counter)
+        self._rooms[join_code] = (version, rool_set_id, player_count, player_limit)
+
+        entry = (-player_count, version, join_code)
+        for key in (None, rool_set_id):
+            heapq.heappush(self._heaps.setdefault(key, []), entry)
+            self._maybe_compact(key)
+
+    def update_count(self, join_code: str, player_count: int):
+        room = self._rooms.get(join_code)
+        if room is not None and room[2] != player_count:
+            _, rool_set_id, _, player_limit = room
+            self.update(join_code, rool_set_id, player_count, player_limit)
+
+    def remove(self, join_code: str):
+        room = self._rooms.pop(join_code, None)
+        if room is None:
+            return
+
+        rool_set_id = room[1]
+        size = self._sizes[rool_set_id] - 1
+        if size:
+            self._sizes[rool_set_id] = size
+        else:
+            del self._sizes[rool_set_id]
+        for key in (None, rool_set_id):
+            self._maybe_compact(key)
+
+    def best(self, rool_set_id: int | None, count: int) -> list[str]:
+        heap = self._heaps.get(rool_set_id)
+        if not heap:
+            return []
+
+        picked = []
+        while heap and len(picked) < count:
+            entry = heapq.heappop(heap)
+            if self._is_current(entry):
+                picked.append(entry)
+
+        for entry in picked:
+            heapq.heappush(heap, entry)
+        return [join_code for _, _, join_code in picked]
+
+    async def handle_event(self, channel: str, messages: list[str]):
+        kind, _, join_code = channel.partition(':')
+        if kind != 'room' or ':' in join_code:
+            return
+
+        for message in messages:
+            # events of rooms that are not indexed are only parsed when they could add the room
+            if join_code not in self._rooms and not message.startswith(ROOM_CREATED_PREFIX):
+                continue
+            event = json.loads(message)
+            if event['event'] == 'room_created':
+                if join_code not in self._rooms:
+                    data = event['data']
+                    self.update(join_code, data['rool_set_id'], data['player_count'], data['player_limit'])
+            elif event['event'] == 'player_joined':
+                self.update_count(join_code, event['data']['player_count'])
+            elif event['event'] == 'game_started':
+                self.remove(join_code)
+
+    def _is_current(self, entry: tuple[int, int, str]) -> bool:
+        room = self._rooms.get(entry[2])
+        return room is not None and room[0] == entry[1]
+
+    def _maybe_compact(self, key: int | None):
+        heap = self._heaps.get(key)
+        live = len(self._rooms) if key is None else self._sizes.get(key, 0)
+        if heap is not None and len(heap) > 2 * live + 64:
+            self._compact(key)
+
+    def _compact(self, key: int | None):
+        heap = [entry for entry in self._heaps[key] if self._is_current(entry)]
+        if not heap:
+            del self._heaps[key]
+            return
+        heapq.heapify(heap)
+        self._heaps[key] = heap
+
+
+fill_index = FillIndex()
@@ -1,10 +1,12 @@
+from datetime import datetime
 from uuid import uuid4
 from sqlalchemy import (
-    String, ForeignKey, SmallInteger, CheckConstraint, UUID, UniqueConstraint
+    String, ForeignKey, SmallInteger, BigInteger, CheckConstraint, UUID, UniqueConstraint, Index, text, DateTime, func,
+    LargeBinary
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.models import TimestampModel, Base
-from .enums import RoomType
+from .enums import RoomType, GamePhase
 from .constants import (
     DEFAULT_PLAYER_LIMIT,
     MIN_PLAYER_LIMIT,
@@ -17,6 +19,20 @@ class Room(TimestampModel):
     __tablename__ = 'rooms'
     __table_args__ = (
         CheckConstraint(f'player_limit >= {MIN_PLAYER_LIMIT}', name='check_min_player_limit'),
+        CheckConstraint('player_count <= player_limit', name='check_player_count'),
+        Index(
+            'ix_rooms_lobby',
+            'created_at',
+            'id',
+            postgresql_where=text("type_ = 'public' AND phase = 'lobby'")
+        ),
+        Index(
+            'ix_rooms_lobby_rool_set',
+            'rool_set_id',
+            'created_at',
+            'id',
+            postgresql_where=text("type_ = 'public' AND phase = 'lobby'")
+        ),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -26,6 +42,8 @@ class Room(TimestampModel):
     join_code: Mapped[UUID] = mapped_column(UUID(as_uuid=True), nullable=False, default=uuid4, unique=True)
     password: Mapped[str] = mapped_column(nullable=True)
     player_limit: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=DEFAULT_PLAYER_LIMIT)
+    player_count: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0)
+    phase: Mapped[GamePhase] = mapped_column(String(32), nullable=False, default=GamePhase.LOBBY.value)
 
     rool_set = relationship('RoolSet')
     creator = relationship('User', back_populates='rooms', uselist=False, cascade='all, delete')
@@ -56,12 +74,15 @@ class UserRoom(TimestampModel):
     __tablename__ = 'users_rooms'
     __table_args__ = (
         UniqueConstraint('user_id', 'room_id', name='unqiue_user_room'),
+        Index('ix_users_rooms_room_id', 'room_id'),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     room_id: Mapped[int] = mapped_column(ForeignKey('rooms.id', ondelete='CASCADE'), nullable=False)
     is_creator: Mapped[bool] = mapped_column(nullable=False, default=False)
+    game_role_id: Mapped[int] = mapped_column(ForeignKey('game_roles.id', ondelete='SET NULL'), nullable=True)
+    is_alive: Mapped[bool] = mapped_column(nullable=False, default=True)
 
 
 class GameRole(Base):
@@ -89,3 +110,37 @@ class RoolSetRole(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     rool_set_id: Mapped[int] = mapped_column(ForeignKey('rool_sets.id', ondelete='CASCADE'), nullable=False)
     game_role_id: Mapped[int] = mapped_column(ForeignKey('game_roles.id', ondelete='CASCADE'), nullable=False)
+
+
+class GameEvent(Base):
+    __tablename__ = 'game_events'
+    __table_args__ = (
+        Index('ix_game_events_room_id_id', 'room_id', 'id'),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    room_id: Mapped[int] = mapped_column(ForeignKey('rooms.id', ondelete='CASCADE'), nullable=False)
+    round: Mapped[int] = mapped_column(SmallInteger, nullable=False)
+    phase: Mapped[str] = mapped_column(String(32), nullable=False)
+    event_type: Mapped[str] = mapped_column(String(32), nullable=False)
+    action: Mapped[str] = mapped_column(String(32), nullable=True)
+    actor_id: Mapped[int] = mapped_column(nullable=True)
+    target_id: Mapped[int] = mapped_column(nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
+
+class GameSnapshot(Base):
+    __tablename__ = 'game_snapshots'
+
+    room_id: Mapped[int] = mapped_column(ForeignKey('rooms.id', ondelete='CASCADE'), primary_key=True)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
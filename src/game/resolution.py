@@ -0,0 +1,54 @@
+from .state import RoomState, PhaseResult
+from .enums import ActionType
+
+
+def resolve_night(state: RoomState) -> PhaseResult:
+    """Resolves every submitted night action in one pass over the actions.
+
+    The mafia target is the strict plurality of KILL votes, a tie kills nobody.
+    A SAVE on the target prevents the death.
+    """
+    result = PhaseResult(state, state.phase)
+    user_ids = state.user_ids
+    kills = [0] * len(user_ids)
+    target = -1
+    target_votes = 0
+    tied = False
+    saved = 0
+
+    for seat, (action, victim) in state.actions.items():
+        if action == ActionType.KILL:
+            votes = kills[victim] + 1
+            kills[victim] = votes
+            if votes > target_votes:
+                tied = False
+                target = victim
+                target_votes = votes
+            elif votes == target_votes:
+                tied = True
+        elif action == ActionType.SAVE:
+            saved |= 1 << victim
+        elif action == ActionType.INVESTIGATE:
+            result.investigations[user_ids[seat]] = (user_ids[victim], bool(state.mafia >> victim & 1))
+
+    if target >= 0 and not tied and not saved >> target & 1:
+        state.alive &= ~(1 << target)
+        result.deaths.append(user_ids[target])
+
+    return result
+
+
+def resolve_nights(states: list[RoomState]) -> list[PhaseResult]:
+    return [resolve_night(state) for state in states]
+
+
+def resolve_day(state: RoomState) -> PhaseResult:
+    """The single player with the most votes is lynched, a tie or no votes lynches nobody."""
+    result = PhaseResult(state, state.phase)
+    target = state.tally.leader()
+
+    if target is not None and state.alive >> target & 1:
+        state.alive &= ~(1 << target)
+        result.deaths.append(state.user_ids[target])
+
+    return result
@@ -0,0 +1,102 @@
+import random
+from src.config import settings
+from .schemas import RoolSetResponse
+from .enums import ActionType
+from .constants import MIN_PLAYER_LIMIT, MAX_PLAYER_LIMIT, SHERIFF_ROLE_NAME, DOCTOR_ROLE_NAME
+
+
+RoleSlot = tuple[int | None, bool, ActionType]
+
+
+class RoleAssignment:
+    __slots__ = ('roles', 'abilities', 'mafia')
+
+    def __init__(self, roles: list[int | None], abilities: list[ActionType], mafia: int):
+        self.roles = roles
+        self.abilities = abilities
+        self.mafia = mafia
+
+
+def role_ability(role_name: str) -> ActionType:
+    role_name = role_name.lower()
+    if role_name == SHERIFF_ROLE_NAME:
+        return ActionType.INVESTIGATE
+    if role_name == DOCTOR_ROLE_NAME:
+        return ActionType.SAVE
+    return ActionType.NO_ACTION
+
+
+def compose_roles(rool_set: RoolSetResponse, player_count: int) -> tuple[RoleSlot, ...]:
+    mafia_roles = [gr for gr in rool_set.game_roles if gr.is_mafia]
+    special_roles = [
+        gr for gr in rool_set.game_roles
+        if not gr.is_mafia and gr.is_special
+        and (rool_set.allow_sheriff or gr.name.lower() != SHERIFF_ROLE_NAME)
+    ]
+    civilian_role = next(
+        (gr for gr in rool_set.game_roles if not gr.is_mafia and not gr.is_special), None
+    )
+
+    mafia_count = max(1, min(player_count * rool_set.mafia_percent // 100, (player_count - 1) // 2))
+    mafia_role_id = mafia_roles[0].id if mafia_roles else None
+    composition = [(mafia_role_id, True, ActionType.KILL)] * mafia_count
+
+    for role in special_roles[:player_count - mafia_count]:
+        composition.append((role.id, False, role_ability(role.name)))
+
+    civilian_role_id = civilian_role.id if civilian_role else None
+    composition.extend(
+        [(civilian_role_id, False, ActionType.NO_ACTION)] * (player_count - len(composition))
+    )
+    return tuple(composition)
+
+
+class RoleAssigner:
+    """Assigns shuffled role compositions to players.
+
+    Compositions for every supported player count are computed once per rool
+    set and reused until the cached rool set object is replaced.
+    """
+
+    def __init__(self, seed: int | None = None):
+        self._rng = random.Random(seed)
+        self._tables: dict[int, tuple[RoolSetResponse, dict[int, tuple[RoleSlot, ...]]]] = {}
+
+    def seed(self, seed: int | None):
+        self._rng.seed(seed)
+
+    def compositions(self, rool_set: RoolSetResponse) -> dict[int, tuple[RoleSlot, ...]]:
+        cached = self._tables.get(rool_set.id)
+        if cached is not None and cached[0] is rool_set:
+            return cached[1]
+
+        table = {
+            player_count: compose_roles(rool_set, player_count)
+            for player_count in range(MIN_PLAYER_LIMIT, MAX_PLAYER_LIMIT + 1)
+        }
+        self._tables[rool_set.id] = (rool_set, table)
+        return table
+
+    def assign(self, rool_set: RoolSetResponse, player_count: int) -> RoleAssignment:
+        return self.assign_many([(rool_set, player_count)])[0]
+
+    def assign_many(self, rooms: list[tuple[RoolSetResponse, int]]) -> list[RoleAssignment]:
+        sample = self._rng.sample
+        assignments = []
+
+        for rool_set, player_count in rooms:
+            composition = self.compositions(rool_set).get(player_count)
+            if composition is None:
+                composition = compose_roles(rool_set, player_count)
+
+            slots = sample(composition, player_count)
+            assignments.append(RoleAssignment(
+                roles=[role_id for role_id, _, _ in slots],
+                abilities=[ability for _, _, ability in slots],
+                mafia=sum(1 << seat for seat, slot in enumerate(slots) if slot[1])
+            ))
+
+        return assignments
+
+
+role_assigner = RoleAssigner(settings.GAME_RNG_SEED)
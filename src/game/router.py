@@ -1,13 +1,22 @@
-from fastapi import APIRouter, status, Depends, Form
+from uuid import UUID
+from fastapi import APIRouter, status, Depends, Form, Query, Request, WebSocket, WebSocketDisconnect
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.user import get_current_user, User
-from src.db import get_db
-from .service import room_service
+from src.user import get_current_user, CachedUser
+from src.user.utils import get_client_ip
+from src.db import get_db, SessionLocal
+from .hub import room_hub
+from .service import room_service, game_service
 from .schemas import (
     RoomResponse,
     RoomCreateRequest,
     RoomDetailResponse,
+    GameActionRequest,
+    GameStateResponse,
+    LobbyPageResponse,
+    QuickJoinResponse,
+    VoteRequest,
 )
+from .constants import DEFAULT_LOBBY_PAGE_SIZE, MAX_LOBBY_PAGE_SIZE
 
 
 router = APIRouter(prefix='/rooms')
@@ -17,27 +26,114 @@ router = APIRouter(prefix='/rooms')
 async def create_room(
     room_data: RoomCreateRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CachedUser = Depends(get_current_user)
 ):
     return await room_service.create(room_data, db, current_user)
 
 
+@router.get('', response_model=LobbyPageResponse)
+async def list_rooms(
+    rool_set_id: int | None = None,
+    has_open_seats: bool = False,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_LOBBY_PAGE_SIZE, ge=1, le=MAX_LOBBY_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_user)
+):
+    return await room_service.list_rooms(db, rool_set_id, has_open_seats, cursor, limit)
+
+
+@router.post('/quick-join', response_model=QuickJoinResponse)
+async def quick_join(
+    rool_set_id: int | None = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_user)
+):
+    return await room_service.quick_join(db, current_user, rool_set_id)
+
+
 @router.post('/{join_code}')
 async def join_room(
-    join_code: str,
+    join_code: UUID,
+    request: Request,
     password: str = Form(None),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CachedUser = Depends(get_current_user)
 ):
-    success = await room_service.join_room(join_code, db, current_user, password)
+    success = await room_service.join_room(str(join_code), db, current_user, password, get_client_ip(request))
     
     return { 'success': success }
 
 
 @router.get('/{join_code}', response_model=RoomDetailResponse)
 async def get_room(
-    join_code: str,
+    join_code: UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CachedUser = Depends(get_current_user)
+):
+    return await room_service.get_room(str(join_code), db, current_user)
+
+
+@router.post('/{join_code}/start', response_model=GameStateResponse)
+async def start_game(
+    join_code: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: CachedUser = Depends(get_current_user)
+):
+    return await game_service.start_game(str(join_code), db, current_user)
+
+
+@router.get('/{join_code}/game', response_model=GameStateResponse)
+async def get_game_state(
+    join_code: UUID,
+    current_user: CachedUser = Depends(get_current_user)
 ):
-    return await room_service.get_room(join_code, db, current_user)
+    return await game_service.get_state(str(join_code), current_user)
+
+
+@router.post('/{join_code}/actions')
+async def submit_action(
+    join_code: UUID,
+    action_data: GameActionRequest,
+    current_user: CachedUser = Depends(get_current_user)
+):
+    success = await game_service.submit_action(str(join_code), action_data, current_user)
+
+    return { 'success': success }
+
+
+@router.post('/{join_code}/votes')
+async def cast_vote(
+    join_code: UUID,
+    vote_data: VoteRequest,
+    current_user: CachedUser = Depends(get_current_user)
+):
+    success = await game_service.cast_vote(str(join_code), vote_data, current_user)
+
+    return { 'success': success }
+
+
+@router.websocket('/{join_code}/ws')
+async def room_channel(websocket: WebSocket, join_code: UUID, token: str | None = None):
+    code = str(join_code)
+    if token is None:
+        authorization = websocket.headers.get('Authorization', '')
+        if authorization.startswith('Bearer'):
+            token = authorization[7:]
+
+    async with SessionLocal() as db:
+        user = await room_service.authorize_channel(code, token, db)
+
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    room_hub.subscribe(code, user.id, websocket)
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        room_hub.unsubscribe(code, websocket)
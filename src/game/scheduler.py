@@ -0,0 +1,106 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable
+from loguru import logger
+
+
+RETRY_DELAY_SECONDS = 1.0
+
+
+class PhaseScheduler:
+    """Fires phase deadlines of every room from a single task backed by a min-heap.
+
+    Cancelled and rescheduled entries stay in the heap and are skipped lazily when popped.
+    Deadlines whose handler raised are fired again after RETRY_DELAY_SECONDS.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[float, int, str]] = []
+        self._entries: dict[str, int] = {}
+        self._counter = itertools.count()
+        self._on_due: Callable[[list[str]], Awaitable[None]] | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def start(self, on_due: Callable[[list[str]], Awaitable[None]]):
+        if self._task is not None:
+            return
+        self._on_due = on_due
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def schedule(self, key: str, deadline: float):
+        seq = next(self._counter)
+        self._entries[key] = seq
+        heapq.heappush(self._heap, (deadline, seq, key))
+
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._compact()
+        if self._wakeup is not None and self._heap[0][1] == seq:
+            self._wakeup.set()
+
+    def reschedule(self, key: str, deadline: float):
+        self.schedule(key, deadline)
+
+    def cancel(self, key: str) -> bool:
+        return self._entries.pop(key, None) is not None
+
+    def _compact(self):
+        self._heap = [entry for entry in self._heap if self._entries.get(entry[2]) == entry[1]]
+        heapq.heapify(self._heap)
+
+    def _pop_due(self, now: float) -> list[str]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, seq, key = heapq.heappop(self._heap)
+            if self._entries.get(key) == seq:
+                del self._entries[key]
+                due.append(key)
+        return due
+
+    def _retry(self, keys: list[str]):
+        retry_at = time.time() + RETRY_DELAY_SECONDS
+        for key in keys:
+            # keys the handler rescheduled before failing keep their new deadline
+            if key not in self._entries:
+                self.schedule(key, retry_at)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            due = self._pop_due(time.time())
+
+            if due:
+                try:
+                    await self._on_due(due)
+                except Exception:
+                    logger.exception(f'failed to process {len(due)} phase deadlines, retrying')
+                    self._retry(due)
+                continue
+
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except TimeoutError:
+                pass
+
+
+phase_scheduler = PhaseScheduler()
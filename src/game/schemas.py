@@ -1,9 +1,9 @@
 from datetime import datetime
 from uuid import UUID
-from typing import List
+from typing import List, Dict
 from pydantic import BaseModel
 from src.user.schemas import UserInRoom
-from .enums import RoomType
+from .enums import RoomType, ActionType, GamePhase, GameWinner
 from .constants import DEFAULT_PLAYER_LIMIT
 
 
@@ -24,6 +24,26 @@ class RoomResponse(BaseModel):
     updated_at: datetime
 
 
+class LobbyRoomResponse(BaseModel):
+    id: int
+    join_code: UUID
+    rool_set_id: int
+    player_limit: int
+    player_count: int
+    created_at: datetime
+
+
+class LobbyPageResponse(BaseModel):
+    rooms: List[LobbyRoomResponse] = []
+    next_cursor: str | None = None
+
+
+class QuickJoinResponse(BaseModel):
+    join_code: UUID
+    player_count: int
+    player_limit: int
+
+
 class GameRoleResponse(BaseModel):
     id: int
     name: str
@@ -51,3 +71,24 @@ class RoomDetailResponse(BaseModel):
     players: List[UserInRoom] = []
     created_at: datetime
     updated_at: datetime
+
+
+class GameActionRequest(BaseModel):
+    action: ActionType
+    target_id: int | None = None
+
+
+class VoteRequest(BaseModel):
+    target_id: int | None = None
+
+
+class GameStateResponse(BaseModel):
+    join_code: UUID
+    phase: GamePhase
+    round: int
+    deadline: datetime | None = None
+    alive_players: List[int] = []
+    role_id: int | None = None
+    is_mafia: bool = False
+    vote_counts: Dict[int, int] = {}
+    winner: GameWinner | None = None
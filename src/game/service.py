@@ -1,20 +1,53 @@
+import asyncio
+import time
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from datetime import datetime, timezone
 from uuid import uuid4
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
+from jwt import InvalidTokenError
+from sqlalchemy import select, update, insert, bindparam, literal, exists, tuple_, and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
-from src.user import User, get_password_hash, verify_password
-from .models import Room, RoolSet, UserRoom
+from loguru import logger
+from src.db import SessionLocal
+from src.user import User, CachedUser, get_password_hash_async, verify_password_async
+from src.user.utils import get_user, get_token_data
+from src.sharding import shard_map
+from src.ratelimit import rate_limiter, ROOM_PASSWORD_PER_IP, ROOM_PASSWORD_PER_USERNAME
+from .models import Room, UserRoom
 from .schemas import (
     RoomCreateRequest,
     RoomResponse,
     RoomDetailResponse,
-    GameRoleResponse,
-    RoolSetResponse,
+    LobbyRoomResponse,
+    LobbyPageResponse,
+    QuickJoinResponse,
     UserInRoom,
+    GameActionRequest,
+    GameStateResponse,
+    VoteRequest,
+    RoolSetResponse,
 )
-from .enums import RoomType
-from .constants import MAX_PLAYER_LIMIT
+from .enums import RoomType, GamePhase, GameEventType
+from .constants import (
+    MAX_PLAYER_LIMIT,
+    MIN_PLAYER_LIMIT,
+    DEFAULT_LOBBY_PAGE_SIZE,
+    QUICK_JOIN_CANDIDATES,
+    PHASE_WRITE_RETRY_SECONDS,
+)
+from .engine import RoomState, PhaseResult, game_engine
+from .state import PhaseBacklog
+from .exceptions import GameNotFoundException
+from .scheduler import phase_scheduler
+from .hub import room_hub
+from .cache import room_detail_cache, rool_set_cache
+from .matchmaking import fill_index
+from .roles import role_assigner
+from .votes import TallyPublisher
+from .event_store import game_event_store
+from .snapshot import save_snapshots, load_snapshots
 
 
 class RoomService:
@@ -23,7 +56,7 @@ class RoomService:
     async def create(
         room_data: RoomCreateRequest,
         db: AsyncSession,
-        user: User
+        user: CachedUser
     ) -> RoomResponse:
         if room_data.type_ == RoomType.PRIVATE and room_data.password is None:
             raise HTTPException(
@@ -36,28 +69,39 @@ class RoomService:
                 detail=f'Current supported maximum number of players per room is {MAX_PLAYER_LIMIT}'
             )
 
-        query = select(RoolSet).where(RoolSet.id == room_data.rool_set_id)
-        result = await db.execute(query)
-        rool_set = result.scalar_one_or_none()
-
+        rool_set = await rool_set_cache.get(room_data.rool_set_id, db)
         if not rool_set:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f'RoolSet with id {room_data.rool_set_id} does not exist'
             )
 
+        password = None
+        if room_data.password is not None:
+            password = await get_password_hash_async(room_data.password)
+
         room = Room(
             type_=room_data.type_,
             creator_id=user.id,
             rool_set_id=room_data.rool_set_id,
             join_code=uuid4(),
-            password=get_password_hash(room_data.password),
+            password=password,
             player_limit=room_data.player_limit
         )
         db.add(room)
         await db.commit()
         await db.refresh(room)
 
+        if room.type_ == RoomType.PUBLIC.value:
+            join_code = str(room.join_code)
+            fill_index.update(join_code, room.rool_set_id, room.player_count, room.player_limit)
+            # lets the fill index of every other worker offer the room to quick join
+            room_hub.publish(
+                join_code,
+                'room_created',
+                {'rool_set_id': room.rool_set_id, 'player_count': room.player_count, 'player_limit': room.player_limit}
+            )
+
         return RoomResponse(
             id=room.id,
             type_=room.type_,
@@ -68,132 +112,295 @@ class RoomService:
             updated_at=room.updated_at
         )
 
+    @staticmethod
+    async def list_rooms(
+        db: AsyncSession,
+        rool_set_id: int | None = None,
+        has_open_seats: bool = False,
+        cursor: str | None = None,
+        limit: int = DEFAULT_LOBBY_PAGE_SIZE
+    ) -> LobbyPageResponse:
+        query = (
+            select(
+                Room.id,
+                Room.join_code,
+                Room.rool_set_id,
+                Room.player_limit,
+                Room.player_count,
+                Room.created_at
+            )
+            .where(Room.type_ == RoomType.PUBLIC.value, Room.phase == GamePhase.LOBBY.value)
+            .order_by(Room.created_at.desc(), Room.id.desc())
+            .limit(limit + 1)
+        )
+        if rool_set_id is not None:
+            query = query.where(Room.rool_set_id == rool_set_id)
+        if has_open_seats:
+            query = query.where(Room.player_count < Room.player_limit)
+        if cursor is not None:
+            created_at, room_id = RoomService._decode_cursor(cursor)
+            query = query.where(tuple_(Room.created_at, Room.id) < tuple_(created_at, room_id))
+
+        result = await db.execute(query)
+        rows = result.all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = RoomService._encode_cursor(rows[-1].created_at, rows[-1].id)
+
+        return LobbyPageResponse(
+            rooms=[
+                LobbyRoomResponse(
+                    id=row.id,
+                    join_code=row.join_code,
+                    rool_set_id=row.rool_set_id,
+                    player_limit=row.player_limit,
+                    player_count=row.player_count,
+                    created_at=row.created_at
+                )
+                for row in rows
+            ],
+            next_cursor=next_cursor
+        )
+
+    @staticmethod
+    def _encode_cursor(created_at: datetime, room_id: int) -> str:
+        return urlsafe_b64encode(f'{created_at.isoformat()}|{room_id}'.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+        try:
+            created_at, room_id = urlsafe_b64decode(cursor.encode()).decode().split('|')
+            created_at, room_id = datetime.fromisoformat(created_at), int(room_id)
+            # rooms.id is a 32-bit serial, anything else would fail in the database
+            if created_at.tzinfo is None or not 0 < room_id < 2 ** 31:
+                raise ValueError(cursor)
+            return created_at, room_id
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Invalid cursor'
+            )
+
+    @staticmethod
+    async def quick_join(db: AsyncSession, user: CachedUser, rool_set_id: int | None = None) -> QuickJoinResponse:
+        for join_code in fill_index.best(rool_set_id, QUICK_JOIN_CANDIDATES):
+            try:
+                room = await RoomService._try_join(join_code, db, user, allow_private=False)
+            except HTTPException:
+                continue
+
+            if room is None:
+                fill_index.remove(join_code)
+                continue
+
+            RoomService._announce_join(join_code, user, room.player_count)
+            return QuickJoinResponse(
+                join_code=join_code,
+                player_count=room.player_count,
+                player_limit=room.player_limit
+            )
+
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='There are no open rooms to join'
+        )
+
     @staticmethod
     async def join_room(
         join_code: str,
         db: AsyncSession,
-        user: User,
-        password: str = None
+        user: CachedUser,
+        password: str = None,
+        client_ip: str | None = None
     ) -> bool:
+        room = await RoomService._try_join(join_code, db, user, allow_private=False)
+        if room is not None:
+            RoomService._announce_join(join_code, user, room.player_count)
+            return True
+
         query = (
-            select(Room)
-            .options(selectinload(Room.users))
+            select(
+                Room.type_,
+                Room.password,
+                Room.creator_id,
+                Room.phase,
+                Room.player_count,
+                Room.player_limit,
+                exists()
+                .where(UserRoom.room_id == Room.id, UserRoom.user_id == user.id)
+                .label('is_member')
+            )
             .where(Room.join_code == join_code)
         )
         result = await db.execute(query)
-        room = result.scalar_one_or_none()
+        room = result.first()
 
         if not room:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail='Room does not exist'
             )
-        
-        existing_membership = await db.execute(
-            select(UserRoom)
-            .where(
-                UserRoom.user_id == user.id,
-                UserRoom.room_id == room.id
-            )
-        )
-        if existing_membership.scalar_one_or_none():
+        if room.is_member:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail='You have already joined this room'
             )
-
-        if room.creator_id == user.id:
-            user_room = UserRoom(
-                user_id=user.id,
-                room_id=room.id,
-                is_creator=True
-            )
-            db.add(user_room)
-            await db.commit()
-            return True
-
-        if room.type_ == RoomType.PRIVATE.value and password is None:
+        if room.phase != GamePhase.LOBBY.value:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail='This room requires password to join'
+                detail='Game has already started'
             )
-        if room.type_ == RoomType.PRIVATE.value and not verify_password(password, room.password):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail='Password incorrect'
+
+        if room.type_ == RoomType.PRIVATE.value and room.creator_id != user.id:
+            if password is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail='This room requires password to join'
+                )
+            await rate_limiter.check(ROOM_PASSWORD_PER_IP, client_ip)
+            await rate_limiter.check(ROOM_PASSWORD_PER_USERNAME, user.username.lower())
+            if not await verify_password_async(password, room.password):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail='Password incorrect'
+                )
+            joined_room = await RoomService._try_join(join_code, db, user, allow_private=True)
+            if joined_room is not None:
+                RoomService._announce_join(join_code, user, joined_room.player_count)
+                return True
+
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Room is full'
+        )
+
+    @staticmethod
+    async def _try_join(join_code: str, db: AsyncSession, user: CachedUser, allow_private: bool):
+        """Claims a seat and inserts the membership in one statement, the seat is only taken if the insert succeeds."""
+        conditions = [
+            Room.join_code == join_code,
+            Room.phase == GamePhase.LOBBY.value,
+            Room.player_count < Room.player_limit,
+        ]
+        if not allow_private:
+            conditions.append(or_(Room.type_ == RoomType.PUBLIC.value, Room.creator_id == user.id))
+
+        slot = (
+            update(Room)
+            .where(*conditions)
+            .values(player_count=Room.player_count + 1)
+            .returning(
+                Room.id,
+                Room.creator_id,
+                Room.type_,
+                Room.rool_set_id,
+                Room.player_count,
+                Room.player_limit
             )
-        
-        query = select(func.count()).select_from(UserRoom).where(UserRoom.room_id == room.id)
-        result = await db.execute(query)
-        user_count = result.scalar_one()
+            .cte('slot')
+        )
+        membership = (
+            insert(UserRoom)
+            .from_select(
+                ['user_id', 'room_id', 'is_creator'],
+                select(literal(user.id), slot.c.id, slot.c.creator_id == user.id)
+            )
+            .returning(UserRoom.room_id)
+            .cte('membership')
+        )
+        query = (
+            select(slot.c.type_, slot.c.rool_set_id, slot.c.player_count, slot.c.player_limit)
+            .join_from(slot, membership, membership.c.room_id == slot.c.id)
+        )
 
-        if user_count >= room.player_limit:
+        try:
+            result = await db.execute(query)
+            room = result.first()
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail='Room is full'
+                detail='You have already joined this room'
             )
-        
-        user_room = UserRoom(
-            user_id=user.id,
-            room_id=room.id,
-            is_creator=False
+
+        if room is not None and room.type_ == RoomType.PUBLIC.value:
+            fill_index.update(join_code, room.rool_set_id, room.player_count, room.player_limit)
+        return room
+
+    @staticmethod
+    async def authorize_channel(join_code: str, token: str | None, db: AsyncSession) -> User | None:
+        if not token:
+            return None
+        try:
+            payload = await get_token_data(token)
+        except InvalidTokenError:
+            return None
+
+        user = await get_user(db, payload.get('sub'))
+        if user is None:
+            return None
+
+        query = (
+            select(Room.creator_id, UserRoom.id)
+            .outerjoin(UserRoom, and_(UserRoom.room_id == Room.id, UserRoom.user_id == user.id))
+            .where(Room.join_code == join_code)
         )
-        db.add(user_room)
-        await db.commit()
-        return True
-    
+        result = await db.execute(query)
+        row = result.first()
+
+        if row is None or (row.creator_id != user.id and row.id is None):
+            return None
+        return user
+
+    @staticmethod
+    def _announce_join(join_code: str, user: CachedUser, player_count: int):
+        room_detail_cache.invalidate(join_code)
+        room_hub.publish(
+            join_code,
+            'player_joined',
+            {'user_id': user.id, 'username': user.username, 'player_count': player_count}
+        )
+
     @staticmethod
     async def get_room(
         join_code: str, 
         db: AsyncSession, 
-        user: User
+        user: CachedUser
     ):
+        cached = room_detail_cache.get(join_code)
+        if cached is not None:
+            response, member_ids = cached
+            RoomService._check_room_access(user, member_ids)
+            return response
+
         query = (
             select(Room)
-            .options(
-                selectinload(Room.rool_set).selectinload(RoolSet.game_roles),
-                selectinload(Room.users)
-            )
+            .options(joinedload(Room.users))
             .where(Room.join_code == join_code)
         )
         result = await db.execute(query)
-        room = result.scalar_one_or_none()
+        room = result.unique().scalar_one_or_none()
 
         if not room:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail='Room does not exist'
             )
-        if user not in room.users and room.creator != user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail='You cannot recieve information about this room'
-            )
-        
-        query = select(func.count()).select_from(UserRoom).where(UserRoom.room_id == room.id)
-        result = await db.execute(query)
-        player_count = result.scalar_one()
 
-        game_roles = [
-            GameRoleResponse(
-                id=gr.id,
-                name=gr.name,
-                is_mafia=gr.is_mafia,
-                is_special=gr.is_special
-            )
-            for gr in room.rool_set.game_roles
-        ]
+        member_ids = frozenset([room.creator_id, *(u.id for u in room.users)])
+        RoomService._check_room_access(user, member_ids)
 
-        rool_set = RoolSetResponse(
-            id=room.rool_set_id,
-            name=room.rool_set.name,
-            mafia_percent=room.rool_set.mafia_percent,
-            allow_sheriff=room.rool_set.allow_sheriff,
-            day_duration_minutes=room.rool_set.day_duration_minutes,
-            night_duration_minutes=room.rool_set.night_duration_minutes,
-            game_roles=game_roles
-        )
+        rool_set = await rool_set_cache.get(room.rool_set_id, db)
+
+        response = RoomService._detail_response(room, rool_set)
+        room_detail_cache.set(join_code, response, member_ids)
+        return response
 
+    @staticmethod
+    def _detail_response(room: Room, rool_set: RoolSetResponse) -> RoomDetailResponse:
         players = [
             UserInRoom.model_validate(u)
             for u in room.users
@@ -202,14 +409,372 @@ class RoomService:
         return RoomDetailResponse(
             id=room.id,
             type_=room.type_,
-            join_code=join_code,
+            join_code=room.join_code,
             player_limit=room.player_limit,
             rool_set=rool_set,
-            player_count=player_count,
+            player_count=room.player_count,
             players=players,
             created_at=room.created_at,
             updated_at=room.updated_at
         )
 
+    @staticmethod
+    def _check_room_access(user: CachedUser, member_ids: frozenset[int]):
+        if user.id not in member_ids:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='You cannot recieve information about this room'
+            )
+
+
+class GameService:
+
+    @staticmethod
+    async def start_game(join_code: str, db: AsyncSession, user: CachedUser) -> GameStateResponse:
+        query = select(Room).where(Room.join_code == join_code)
+        result = await db.execute(query)
+        room = result.scalar_one_or_none()
+
+        if not room:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail='Room does not exist'
+            )
+        if room.creator_id != user.id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Only the room creator can start the game'
+            )
+        if room.phase != GamePhase.LOBBY.value:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Game has already started'
+            )
+
+        query = select(UserRoom.user_id).where(UserRoom.room_id == room.id).order_by(UserRoom.id)
+        result = await db.execute(query)
+        user_ids = list(result.scalars())
+
+        if len(user_ids) < MIN_PLAYER_LIMIT:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f'At least {MIN_PLAYER_LIMIT} players are required to start the game'
+            )
+
+        rool_set = await rool_set_cache.get(room.rool_set_id, db)
+        assignment = role_assigner.assign(rool_set, len(user_ids))
+
+        state = RoomState(
+            room_id=room.id,
+            join_code=str(room.join_code),
+            rool_set_id=room.rool_set_id,
+            day_duration=rool_set.day_duration_minutes * 60,
+            night_duration=rool_set.night_duration_minutes * 60,
+            user_ids=user_ids,
+            roles=assignment.roles,
+            abilities=assignment.abilities,
+            mafia=assignment.mafia
+        )
+        result = game_engine.start(state)
+
+        try:
+            await GameService._persist_roles(state, db)
+            await GameService._persist_phases([result], db)
+        except Exception:
+            game_engine.remove(state.join_code)
+            raise
+
+        phase_scheduler.schedule(state.join_code, state.deadline)
+        fill_index.remove(state.join_code)
+        game_event_store.record(state, GameEventType.GAME_STARTED, actor_id=user.id)
+        room_hub.publish(state.join_code, 'game_started', GameService._phase_event(state, []))
+        return GameService._state_response(state, user.id)
+
+    @staticmethod
+    async def submit_action(join_code: str, action_data: GameActionRequest, user: CachedUser) -> bool:
+        state = game_engine.get(join_code)
+        if state is None:
+            raise GameNotFoundException()
+
+        game_engine.submit_action(state, user.id, action_data.action, action_data.target_id)
+        game_event_store.record(
+            state, GameEventType.ACTION, action_data.action.value, user.id, action_data.target_id
+        )
+        if game_engine.all_actions_submitted(state):
+            phase_scheduler.reschedule(join_code, time.time())
+        return True
+
+    @staticmethod
+    async def cast_vote(join_code: str, vote_data: VoteRequest, user: CachedUser) -> bool:
+        state = game_engine.get(join_code)
+        if state is None:
+            raise GameNotFoundException()
+
+        game_engine.cast_vote(state, user.id, vote_data.target_id)
+        game_event_store.record(state, GameEventType.VOTE, actor_id=user.id, target_id=vote_data.target_id)
+        tally_publisher.mark(state)
+        if game_engine.voting_complete(state):
+            phase_scheduler.reschedule(join_code, time.time())
+        return True
+
+    @staticmethod
+    def _publish_tally(state: RoomState, changes: dict[int, int]):
+        leader = state.tally.leader()
+        room_hub.publish(
+            state.join_code,
+            'votes_changed',
+            {
+                'counts': {state.user_ids[seat]: count for seat, count in changes.items()},
+                'leader': state.user_ids[leader] if leader is not None else None,
+                'majority': state.tally.has_majority(state.alive_count),
+            }
+        )
+
+    @staticmethod
+    async def get_state(join_code: str, user: CachedUser) -> GameStateResponse:
+        state = game_engine.get(join_code)
+        if state is None:
+            raise GameNotFoundException()
+
+        state.seat_of(user.id)
+        return GameService._state_response(state, user.id)
+
+    @staticmethod
+    async def end_phases(join_codes: list[str]):
+        states = [state for state in map(game_engine.get, join_codes) if state is not None]
+        if not states:
+            return
+
+        async with SessionLocal() as db:
+            await GameService._end_phases(states, db)
+
+    @staticmethod
+    async def restore(db: AsyncSession) -> int:
+        """Loads the rooms snapshotted by a previous worker and schedules their deadlines."""
+        states = [state for state in await load_snapshots(db) if shard_map.is_local(state.join_code)]
+        for state in states:
+            if state.join_code in game_engine:
+                continue
+            game_engine.add(state)
+            phase_scheduler.schedule(state.join_code, state.deadline)
+        return len(states)
+
+    @staticmethod
+    async def snapshot(db: AsyncSession):
+        states = game_engine.states()
+        if not states:
+            return
+        try:
+            await save_snapshots(states, db)
+            await db.commit()
+        except IntegrityError:
+            await GameService._rollback(db)
+            # a room was deleted under a running game, save the others one by one
+            for state in states:
+                try:
+                    await save_snapshots([state], db)
+                    await db.commit()
+                except IntegrityError:
+                    await GameService._rollback(db)
+                    logger.warning(f'not saving a snapshot of {state.join_code}, its room is gone')
+
+    @staticmethod
+    async def flush_phases(db: AsyncSession):
+        """Stops retrying in the background and makes a last attempt to write the phase backlog."""
+        if phase_backlog.retry is not None:
+            phase_backlog.retry.cancel()
+            phase_backlog.retry = None
+        if phase_backlog:
+            await GameService._write_phases([], db)
+
+    @staticmethod
+    async def _end_phases(states: list[RoomState], db: AsyncSession) -> list[PhaseResult]:
+        results = game_engine.advance_many(states)
+
+        if not await GameService._write_phases(results, db):
+            GameService._retry_phases_later()
+
+        for result in results:
+            state = result.state
+            if game_engine.get(state.join_code) is not state:
+                # dropped while writing, its room no longer exists
+                continue
+            ended_round = state.round - 1 if state.phase == GamePhase.NIGHT else state.round
+            for user_id in result.deaths:
+                game_event_store.record(
+                    state, GameEventType.DEATH, target_id=user_id, phase=result.previous_phase, round_=ended_round
+                )
+            game_event_store.record(state, GameEventType.PHASE_CHANGED)
+
+            if state.phase == GamePhase.FINISHED:
+                game_engine.remove(state.join_code)
+                phase_scheduler.cancel(state.join_code)
+            else:
+                phase_scheduler.schedule(state.join_code, state.deadline)
+
+            room_hub.publish(state.join_code, 'phase_changed', GameService._phase_event(state, result.deaths))
+            for user_id, (target_id, is_mafia) in result.investigations.items():
+                room_hub.publish_to_user(
+                    state.join_code,
+                    user_id,
+                    'investigation_result',
+                    {'target_id': target_id, 'is_mafia': is_mafia}
+                )
+
+        return results
+
+    @staticmethod
+    async def _write_phases(results: list[PhaseResult], db: AsyncSession) -> bool:
+        """Persists the results together with the backlog of earlier failed writes.
+
+        The game has already moved on in memory, so on failure the results stay
+        in the backlog and are written again with the next batch. An integrity
+        error will not go away on retry, the batch is then written room by room.
+        """
+        phase_backlog.add(results)
+        batch = phase_backlog.take()
+        try:
+            await GameService._persist_phases(batch, db)
+        except IntegrityError:
+            await GameService._rollback(db)
+            return await GameService._write_each_phase(batch, db)
+        except Exception:
+            phase_backlog.add(batch)
+            logger.exception(f'failed to persist phase change of {len(batch)} rooms, retrying')
+            await GameService._rollback(db)
+            return False
+        return True
+
+    @staticmethod
+    async def _write_each_phase(batch: list[PhaseResult], db: AsyncSession) -> bool:
+        """Writes the rooms of a batch one at a time, results that can never be written are dropped.
+
+        Games whose room row was deleted are removed from the engine and the scheduler.
+        """
+        written = True
+        for result in batch:
+            join_code = result.state.join_code
+            try:
+                await GameService._persist_phases([result], db)
+            except IntegrityError:
+                await GameService._rollback(db)
+                if await GameService._room_exists(result.state.room_id, db):
+                    logger.exception(f'dropping phase change of {join_code} that cannot be written')
+                else:
+                    logger.warning(f'room {join_code} is gone from the database, dropping its game')
+                    game_engine.remove(join_code)
+                    phase_scheduler.cancel(join_code)
+            except Exception:
+                phase_backlog.add([result])
+                logger.exception(f'failed to persist phase change of {join_code}, retrying')
+                await GameService._rollback(db)
+                written = False
+        return written
+
+    @staticmethod
+    async def _room_exists(room_id: int, db: AsyncSession) -> bool:
+        try:
+            return await db.scalar(select(exists().where(Room.id == room_id)))
+        except Exception:
+            logger.exception(f'failed to look up room {room_id}')
+            await GameService._rollback(db)
+            # keep the game, it is dropped on a later write if the room is really gone
+            return True
+
+    @staticmethod
+    async def _rollback(db: AsyncSession):
+        try:
+            await db.rollback()
+        except Exception:
+            logger.exception('rollback after a failed write failed')
+
+    @staticmethod
+    def _retry_phases_later():
+        if phase_backlog.retry is None or phase_backlog.retry.done():
+            phase_backlog.retry = asyncio.create_task(GameService._retry_phases())
+
+    @staticmethod
+    async def _retry_phases():
+        while phase_backlog:
+            await asyncio.sleep(PHASE_WRITE_RETRY_SECONDS)
+            async with SessionLocal() as db:
+                await GameService._write_phases([], db)
+
+    @staticmethod
+    async def _persist_roles(state: RoomState, db: AsyncSession):
+        query = (
+            update(UserRoom.__table__)
+            .where(
+                UserRoom.room_id == state.room_id,
+                UserRoom.user_id == bindparam('b_user_id')
+            )
+            .values(game_role_id=bindparam('b_game_role_id'), is_alive=True)
+        )
+        await db.execute(
+            query,
+            [
+                {'b_user_id': user_id, 'b_game_role_id': role_id}
+                for user_id, role_id in zip(state.user_ids, state.roles)
+            ]
+        )
+
+    @staticmethod
+    async def _persist_phases(results: list[PhaseResult], db: AsyncSession):
+        rooms = Room.__table__
+        await db.execute(
+            update(rooms)
+            .where(rooms.c.id == bindparam('b_room_id'))
+            .values(phase=bindparam('b_phase')),
+            [{'b_room_id': result.state.room_id, 'b_phase': result.state.phase.value} for result in results]
+        )
+
+        deaths = [
+            {'b_room_id': result.state.room_id, 'b_user_id': user_id}
+            for result in results
+            for user_id in result.deaths
+        ]
+        if deaths:
+            users_rooms = UserRoom.__table__
+            await db.execute(
+                update(users_rooms)
+                .where(
+                    users_rooms.c.room_id == bindparam('b_room_id'),
+                    users_rooms.c.user_id == bindparam('b_user_id')
+                )
+                .values(is_alive=False),
+                deaths
+            )
+        await save_snapshots([result.state for result in results], db)
+        await db.commit()
+
+    @staticmethod
+    def _phase_event(state: RoomState, deaths: list[int]) -> dict:
+        return {
+            'phase': state.phase.value,
+            'round': state.round,
+            'deadline': state.deadline or None,
+            'deaths': deaths,
+            'alive_players': state.alive_user_ids(),
+            'winner': state.winner.value if state.winner else None,
+        }
+
+    @staticmethod
+    def _state_response(state: RoomState, user_id: int) -> GameStateResponse:
+        seat = state.seats.get(user_id)
+        return GameStateResponse(
+            join_code=state.join_code,
+            phase=state.phase,
+            round=state.round,
+            deadline=datetime.fromtimestamp(state.deadline, timezone.utc) if state.deadline else None,
+            alive_players=state.alive_user_ids(),
+            role_id=state.roles[seat] if seat is not None else None,
+            is_mafia=state.is_mafia(seat) if seat is not None else False,
+            vote_counts={state.user_ids[target]: count for target, count in state.tally.counts.items()},
+            winner=state.winner
+        )
+
 
 room_service = RoomService()
+game_service = GameService()
+tally_publisher = TallyPublisher(GameService._publish_tally)
+phase_backlog = PhaseBacklog()
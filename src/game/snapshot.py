@@ -0,0 +1,160 @@
+import struct
+from uuid import UUID
+from loguru import logger
+from sqlalchemy import select, delete, bindparam, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from .enums import GamePhase, GameWinner, ActionType
+from .models import GameSnapshot
+from .state import RoomState
+
+
+SNAPSHOT_VERSION = 1
+
+PHASES = list(GamePhase)
+WINNERS = [None, *GameWinner]
+ACTIONS = list(ActionType)
+
+# version, phase, winner, player count, round, deadline, alive, mafia,
+# room id, rool set id, day duration, night duration, join code
+HEADER = struct.Struct('<BBBBHdIIIIII16s')
+# user id, role id (-1 when the player has no role), ability
+SEAT = struct.Struct('<IiB')
+PAIR = struct.Struct('<BBB')
+COUNT = struct.Struct('<BB')
+
+
+def encode_state(state: RoomState) -> bytes:
+    """Packs a room into a fixed layout: header, one record per seat, then pending actions and votes."""
+    parts = [
+        HEADER.pack(
+            SNAPSHOT_VERSION,
+            PHASES.index(state.phase),
+            WINNERS.index(state.winner),
+            len(state.user_ids),
+            state.round,
+            state.deadline,
+            state.alive,
+            state.mafia,
+            state.room_id,
+            state.rool_set_id,
+            state.day_duration,
+            state.night_duration,
+            UUID(state.join_code).bytes
+        )
+    ]
+    for user_id, role_id, ability in zip(state.user_ids, state.roles, state.abilities):
+        parts.append(SEAT.pack(user_id, -1 if role_id is None else role_id, ACTIONS.index(ability)))
+
+    parts.append(COUNT.pack(len(state.actions), len(state.tally.votes)))
+    for seat, (action, target) in state.actions.items():
+        parts.append(PAIR.pack(seat, ACTIONS.index(action), target))
+    for voter, target in state.tally.votes.items():
+        parts.append(PAIR.pack(voter, 0, target))
+    return b''.join(parts)
+
+
+def decode_state(data: bytes) -> RoomState:
+    """Unpacks a snapshot, raises ValueError when it has another version or is truncated or corrupt."""
+    if not data or data[0] != SNAPSHOT_VERSION:
+        raise ValueError(f'unsupported snapshot version {data[0] if data else None}')
+    try:
+        return _decode_state(data)
+    except (struct.error, IndexError) as exc:
+        raise ValueError(f'corrupt snapshot: {exc}') from exc
+
+
+def _decode_state(data: bytes) -> RoomState:
+    (
+        version,
+        phase,
+        winner,
+        player_count,
+        round_,
+        deadline,
+        alive,
+        mafia,
+        room_id,
+        rool_set_id,
+        day_duration,
+        night_duration,
+        join_code
+    ) = HEADER.unpack_from(data)
+
+    offset = HEADER.size
+    user_ids, roles, abilities = [], [], []
+    for _ in range(player_count):
+        user_id, role_id, ability = SEAT.unpack_from(data, offset)
+        offset += SEAT.size
+        user_ids.append(user_id)
+        roles.append(None if role_id < 0 else role_id)
+        abilities.append(ACTIONS[ability])
+
+    state = RoomState(
+        room_id,
+        str(UUID(bytes=join_code)),
+        rool_set_id,
+        day_duration,
+        night_duration,
+        user_ids,
+        roles,
+        abilities,
+        mafia
+    )
+    state.phase = PHASES[phase]
+    state.winner = WINNERS[winner]
+    state.round = round_
+    state.deadline = deadline
+    state.alive = alive
+
+    action_count, vote_count = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    for _ in range(action_count):
+        seat, action, target = PAIR.unpack_from(data, offset)
+        offset += PAIR.size
+        if seat >= player_count or target >= player_count:
+            raise ValueError(f'action of seat {seat} on {target} in a room of {player_count}')
+        state.actions[seat] = (ACTIONS[action], target)
+    for _ in range(vote_count):
+        voter, _, target = PAIR.unpack_from(data, offset)
+        offset += PAIR.size
+        if voter >= player_count or target >= player_count:
+            raise ValueError(f'vote of seat {voter} for {target} in a room of {player_count}')
+        state.tally.cast(voter, target)
+    state.tally.pop_changes()
+
+    if offset != len(data):
+        raise ValueError(f'{len(data) - offset} unexpected bytes after the snapshot')
+    return state
+
+
+async def save_snapshots(states: list[RoomState], db: AsyncSession):
+    """Upserts snapshots of running rooms and drops those of finished ones, the caller commits."""
+    running = [state for state in states if state.phase != GamePhase.FINISHED]
+    finished = [state.room_id for state in states if state.phase == GamePhase.FINISHED]
+
+    if running:
+        snapshots = GameSnapshot.__table__
+        query = insert(snapshots).values(room_id=bindparam('b_room_id'), data=bindparam('b_data'))
+        query = query.on_conflict_do_update(
+            index_elements=[snapshots.c.room_id],
+            set_={'data': query.excluded.data, 'updated_at': func.now()}
+        )
+        await db.execute(
+            query,
+            [{'b_room_id': state.room_id, 'b_data': encode_state(state)} for state in running]
+        )
+    if finished:
+        await db.execute(delete(GameSnapshot).where(GameSnapshot.room_id.in_(finished)))
+
+
+async def load_snapshots(db: AsyncSession) -> list[RoomState]:
+    """Decodes every stored snapshot, unreadable ones are logged and skipped."""
+    result = await db.execute(select(GameSnapshot.room_id, GameSnapshot.data))
+    states = []
+    for room_id, data in result:
+        try:
+            states.append(decode_state(data))
+        except ValueError:
+            logger.exception(f'skipping unreadable snapshot of room {room_id}')
+    return states
@@ -0,0 +1,110 @@
+from .enums import GamePhase, GameWinner, ActionType
+from .exceptions import GameActionException
+from .votes import VoteTally
+
+
+class RoomState:
+    """Live state of a running game. Players are addressed by seat index, alive/mafia are bitmasks."""
+
+    __slots__ = (
+        'room_id',
+        'join_code',
+        'rool_set_id',
+        'day_duration',
+        'night_duration',
+        'phase',
+        'round',
+        'deadline',
+        'user_ids',
+        'seats',
+        'roles',
+        'abilities',
+        'alive',
+        'mafia',
+        'actions',
+        'tally',
+        'winner',
+    )
+
+    def __init__(
+        self,
+        room_id: int,
+        join_code: str,
+        rool_set_id: int,
+        day_duration: int,
+        night_duration: int,
+        user_ids: list[int],
+        roles: list[int | None],
+        abilities: list[ActionType],
+        mafia: int
+    ):
+        self.room_id = room_id
+        self.join_code = join_code
+        self.rool_set_id = rool_set_id
+        self.day_duration = day_duration
+        self.night_duration = night_duration
+        self.phase = GamePhase.LOBBY
+        self.round = 0
+        self.deadline = 0.0
+        self.user_ids = user_ids
+        self.seats = {user_id: seat for seat, user_id in enumerate(user_ids)}
+        self.roles = roles
+        self.abilities = abilities
+        self.alive = (1 << len(user_ids)) - 1
+        self.mafia = mafia
+        self.actions: dict[int, tuple[ActionType, int]] = {}
+        self.tally = VoteTally()
+        self.winner: GameWinner | None = None
+
+    def is_alive(self, seat: int) -> bool:
+        return bool(self.alive >> seat & 1)
+
+    def is_mafia(self, seat: int) -> bool:
+        return bool(self.mafia >> seat & 1)
+
+    @property
+    def alive_count(self) -> int:
+        return self.alive.bit_count()
+
+    def alive_user_ids(self) -> list[int]:
+        return [user_id for seat, user_id in enumerate(self.user_ids) if self.alive >> seat & 1]
+
+    def seat_of(self, user_id: int) -> int:
+        seat = self.seats.get(user_id)
+        if seat is None:
+            raise GameActionException('You are not a player in this game')
+        return seat
+
+
+class PhaseResult:
+    __slots__ = ('state', 'previous_phase', 'deaths', 'investigations')
+
+    def __init__(self, state: RoomState, previous_phase: GamePhase):
+        self.state = state
+        self.previous_phase = previous_phase
+        self.deaths: list[int] = []
+        self.investigations: dict[int, tuple[int, bool]] = {}
+
+
+class PhaseBacklog:
+    """Phase results whose write failed, merged per room until a later write succeeds."""
+
+    def __init__(self):
+        self._results: dict[str, PhaseResult] = {}
+        self.retry = None
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def add(self, results: list[PhaseResult]):
+        for result in results:
+            pending = self._results.get(result.state.join_code)
+            if pending is None:
+                pending = PhaseResult(result.state, result.previous_phase)
+                self._results[result.state.join_code] = pending
+            pending.deaths.extend(result.deaths)
+
+    def take(self) -> list[PhaseResult]:
+        results = list(self._results.values())
+        self._results.clear()
+        return results
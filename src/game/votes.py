@@ -0,0 +1,112 @@
+import asyncio
+
+
+class VoteTally:
+    """Day vote counts with O(1) cast, retract and leader queries.
+
+    Targets are grouped into buckets by their current count. A single cast or
+    retract moves one target by one, so the maximum count moves by at most one.
+    """
+
+    __slots__ = ('votes', 'counts', 'buckets', 'max_count', 'changes')
+
+    def __init__(self):
+        self.votes: dict[int, int] = {}
+        self.counts: dict[int, int] = {}
+        self.buckets: dict[int, set[int]] = {}
+        self.max_count = 0
+        self.changes: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.votes)
+
+    def cast(self, voter: int, target: int):
+        previous = self.votes.get(voter)
+        if previous == target:
+            return
+        if previous is not None:
+            self._decrement(previous)
+        self.votes[voter] = target
+        self._increment(target)
+
+    def retract(self, voter: int):
+        previous = self.votes.pop(voter, None)
+        if previous is not None:
+            self._decrement(previous)
+
+    def leader(self) -> int | None:
+        if self.max_count == 0:
+            return None
+        leaders = self.buckets[self.max_count]
+        if len(leaders) != 1:
+            return None
+        return next(iter(leaders))
+
+    def has_majority(self, voters: int) -> bool:
+        return self.max_count * 2 > voters
+
+    def pop_changes(self) -> dict[int, int]:
+        changes, self.changes = self.changes, {}
+        return changes
+
+    def clear(self):
+        self.votes.clear()
+        self.counts.clear()
+        self.buckets.clear()
+        self.max_count = 0
+        self.changes.clear()
+
+    def _increment(self, target: int):
+        count = self.counts.get(target, 0)
+        if count:
+            self._leave_bucket(target, count)
+        count += 1
+        self.counts[target] = count
+        self.buckets.setdefault(count, set()).add(target)
+        if count > self.max_count:
+            self.max_count = count
+        self.changes[target] = count
+
+    def _decrement(self, target: int):
+        count = self.counts[target]
+        self._leave_bucket(target, count)
+        if count == self.max_count and count not in self.buckets:
+            self.max_count = count - 1
+
+        count -= 1
+        if count:
+            self.counts[target] = count
+            self.buckets.setdefault(count, set()).add(target)
+        else:
+            del self.counts[target]
+        self.changes[target] = count
+
+    def _leave_bucket(self, target: int, count: int):
+        bucket = self.buckets[count]
+        bucket.discard(target)
+        if not bucket:
+            del self.buckets[count]
+
+
+class TallyPublisher:
+    """Collects rooms whose tally changed and publishes one coalesced delta per room per loop tick."""
+
+    def __init__(self, publish):
+        self._publish = publish
+        self._dirty: dict[str, object] = {}
+        self._scheduled = False
+
+    def mark(self, state):
+        self._dirty[state.join_code] = state
+        if not self._scheduled:
+            self._scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+
+    def _flush(self):
+        dirty, self._dirty = self._dirty, {}
+        self._scheduled = False
+
+        for state in dirty.values():
+            changes = state.tally.pop_changes()
+            if changes:
+                self._publish(state, changes)
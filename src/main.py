@@ -1,18 +1,90 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from loguru import logger
 from sqladmin import Admin
 from src.user.router import user_router, token_router
 from src.user.admin import AdminAuth
+from src.user.utils import password_hasher
+from src.user.cache import user_cache
 from src.game.router import router as game_router
 from src.game.admin import RoolSetAdminView, GameRoleAdminView
-from src.middleware import AuthenticationMiddleware
+from src.game.service import game_service
+from src.game.scheduler import phase_scheduler
+from src.game.hub import room_hub
+from src.game.cache import room_detail_cache, rool_set_cache
+from src.game.matchmaking import fill_index
+from src.game.event_store import game_event_store
+from src.bus import event_bus
+from src.ratelimit import rate_limiter
+from src.sharding import shard_proxy
+from src.middleware import AuthenticationMiddleware, ShardingMiddleware, MetricsMiddleware
 from src.config import settings
-from src.db import engine
+from src.db import engine, SessionLocal, pool_metrics
+from src.metrics import metrics, instrument_engine, router as metrics_router
+from src.game.engine import game_engine
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    event_bus.subscribe(room_hub.deliver)
+    event_bus.subscribe(room_detail_cache.handle_event)
+    event_bus.subscribe(rool_set_cache.handle_event)
+    event_bus.subscribe(fill_index.handle_event)
+    event_bus.subscribe(user_cache.handle_event)
+    await event_bus.start()
+    try:
+        async with SessionLocal() as db:
+            await rool_set_cache.load(db)
+            await fill_index.load(db)
+    except Exception:
+        logger.exception('failed to preload rool sets and open rooms')
+    try:
+        async with SessionLocal() as db:
+            restored = await game_service.restore(db)
+        logger.info(f'restored {restored} running games from snapshots')
+    except Exception:
+        logger.exception('failed to restore game snapshots')
+    phase_scheduler.start(game_service.end_phases)
+    game_event_store.start()
+    yield
+    await phase_scheduler.stop()
+    try:
+        async with SessionLocal() as db:
+            await game_service.flush_phases(db)
+            await game_service.snapshot(db)
+    except Exception:
+        logger.exception('failed to snapshot running games')
+    await game_event_store.stop()
+    await event_bus.stop()
+    await rate_limiter.close()
+    await shard_proxy.close()
+    password_hasher.shutdown()
+
+
+instrument_engine(engine)
+metrics.register_gauge('game_rooms_active', 'Running games hosted by this worker.', lambda: len(game_engine))
+metrics.register_gauge('lobby_rooms_open', 'Open public lobbies known to matchmaking.', lambda: len(fill_index))
+metrics.register_gauge('websocket_rooms', 'Rooms with at least one websocket on this worker.', lambda: room_hub.room_count)
+metrics.register_gauge('websocket_connections', 'Open websockets on this worker.', lambda: room_hub.connection_count)
+metrics.register_gauge('phase_deadlines_scheduled', 'Pending phase deadlines.', lambda: len(phase_scheduler))
+metrics.register_gauge('game_events_buffered', 'Game events waiting to be written.', lambda: len(game_event_store))
+metrics.register_counter('game_events_dropped_total', 'Game events dropped since start.', lambda: game_event_store.dropped)
+metrics.register_gauge('password_hash_pending', 'Password hashes running or queued.', lambda: password_hasher.pending)
+metrics.register_counter('password_hash_rejected_total', 'Password hashes rejected since start.', lambda: password_hasher.rejected)
+metrics.register_counter('shard_requests_forwarded_total', 'Requests forwarded to the owning worker.', lambda: shard_proxy.forwarded)
+metrics.register_counter('shard_forward_failures_total', 'Requests the owning worker did not answer.', lambda: shard_proxy.failed)
+metrics.register_counter('rate_limit_rejected_total', 'Requests rejected by rate limits.', lambda: rate_limiter.rejected)
+metrics.register_gauge('db_pool_checked_out', 'Connections checked out of the pool.', lambda: pool_metrics.metrics()['checked_out'])
+metrics.register_gauge('db_pool_overflow', 'Connections opened beyond the pool size.', lambda: pool_metrics.metrics()['overflow'])
+metrics.register_counter('db_pool_timeouts_total', 'Pool checkouts that timed out.', lambda: pool_metrics.timeouts)
+metrics.register_counter('db_pool_wait_seconds_total', 'Time spent waiting for a pool connection.', lambda: pool_metrics.wait_seconds)
+
+app = FastAPI(lifespan=lifespan)
 
 # When creating new public routes they should be added to PUBLIC_ROUTES in middleware.py
 app.add_middleware(AuthenticationMiddleware)
+app.add_middleware(ShardingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 admin_authentication = AdminAuth(settings.SECRET_KEY)
 admin = Admin(app, engine=engine, authentication_backend=admin_authentication)
@@ -23,3 +95,4 @@ admin.add_view(GameRoleAdminView)
 app.include_router(token_router, tags=['Auth'])
 app.include_router(user_router, tags=['Users'])
 app.include_router(game_router, tags=['Game'])
+app.include_router(metrics_router, tags=['Metrics'])
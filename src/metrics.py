@@ -0,0 +1,192 @@
+import bisect
+import time
+from contextvars import ContextVar
+from typing import Callable
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+HASH_BUCKETS = (0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5, 0.75, 1.0, 2.0)
+
+BACKGROUND_ROUTE = 'background'
+OTHER_ROUTE = 'other'
+
+
+class Histogram:
+    """Fixed-bucket histogram, observations only bump preallocated counters."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> list[str]:
+        prefix = f'{labels},' if labels else ''
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {self.count}')
+        suffix = f'{{{labels}}}' if labels else ''
+        lines.append(f'{name}_sum{suffix} {self.sum}')
+        lines.append(f'{name}_count{suffix} {self.count}')
+        return lines
+
+
+class RouteStats:
+    """Counters of one route template, responses are counted per status class (1xx..5xx)."""
+
+    __slots__ = ('label', 'latency', 'db_latency', 'responses', 'queries', 'query_seconds')
+
+    def __init__(self, route: str):
+        self.label = f'route="{route}"'
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_latency = Histogram(LATENCY_BUCKETS)
+        self.responses = [0] * 6
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+class RequestStats:
+    """Queries of one request, statements are only kept when tracking was asked for."""
+
+    __slots__ = ('queries', 'query_seconds', 'statements')
+
+    def __init__(self, track_statements: bool = False):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.statements: dict[str, int] | None = {} if track_statements else None
+
+    def merge(self, other: 'RequestStats'):
+        self.queries += other.queries
+        self.query_seconds += other.query_seconds
+        if self.statements is not None and other.statements:
+            for statement, count in other.statements.items():
+                self.statements[statement] = self.statements.get(statement, 0) + count
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        if not self.statements:
+            return []
+        return [(statement, count) for statement, count in self.statements.items() if count >= threshold]
+
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text format.
+
+    Everything is updated from the event loop thread, so plain integer counters
+    are enough and no locks are taken on the request path.
+    """
+
+    def __init__(self):
+        self.routes: dict[str, RouteStats] = {}
+        self.background = RequestStats()
+        self.password_hash = Histogram(HASH_BUCKETS)
+        self._collected: list[tuple[str, str, str, Callable[[], float]]] = []
+
+    def route(self, route: str) -> RouteStats:
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = RouteStats(route)
+        return stats
+
+    def register_gauge(self, name: str, description: str, getter: Callable[[], float]):
+        self._collected.append((name, description, 'gauge', getter))
+
+    def register_counter(self, name: str, description: str, getter: Callable[[], float]):
+        self._collected.append((name, description, 'counter', getter))
+
+    def observe_request(self, route: str, status: int, seconds: float, request: RequestStats):
+        stats = self.route(route)
+        stats.latency.observe(seconds)
+        stats.responses[min(status // 100, 5)] += 1
+        stats.queries += request.queries
+        stats.query_seconds += request.query_seconds
+        stats.db_latency.observe(request.query_seconds)
+
+    def render(self) -> str:
+        lines = [
+            '# HELP http_requests_total Responses per route and status class.',
+            '# TYPE http_requests_total counter',
+        ]
+        routes = sorted(self.routes.values(), key=lambda stats: stats.label)
+        for stats in routes:
+            for status_class, count in enumerate(stats.responses):
+                if count:
+                    lines.append(f'http_requests_total{{{stats.label},status="{status_class}xx"}} {count}')
+
+        lines.append('# HELP http_request_duration_seconds Request latency per route.')
+        lines.append('# TYPE http_request_duration_seconds histogram')
+        for stats in routes:
+            lines.extend(stats.latency.render('http_request_duration_seconds', stats.label))
+
+        lines.append('# HELP http_request_db_duration_seconds Time spent in DB queries per request.')
+        lines.append('# TYPE http_request_db_duration_seconds histogram')
+        for stats in routes:
+            lines.extend(stats.db_latency.render('http_request_db_duration_seconds', stats.label))
+
+        lines.append('# HELP db_queries_total DB queries executed per route.')
+        lines.append('# TYPE db_queries_total counter')
+        for stats in routes:
+            lines.append(f'db_queries_total{{{stats.label}}} {stats.queries}')
+        lines.append(f'db_queries_total{{route="{BACKGROUND_ROUTE}"}} {self.background.queries}')
+
+        lines.append('# HELP db_query_seconds_total Time spent in DB queries per route.')
+        lines.append('# TYPE db_query_seconds_total counter')
+        for stats in routes:
+            lines.append(f'db_query_seconds_total{{{stats.label}}} {stats.query_seconds}')
+        lines.append(f'db_query_seconds_total{{route="{BACKGROUND_ROUTE}"}} {self.background.query_seconds}')
+
+        lines.append('# HELP password_hash_duration_seconds Duration of bcrypt hash and verify calls.')
+        lines.append('# TYPE password_hash_duration_seconds histogram')
+        lines.extend(self.password_hash.render('password_hash_duration_seconds', ''))
+
+        for name, description, kind, getter in self._collected:
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'{name} {getter()}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+current_request: ContextVar[RequestStats | None] = ContextVar('current_request', default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    stats = current_request.get() or metrics.background
+    stats.queries += 1
+    stats.query_seconds += elapsed
+    if stats.statements is not None:
+        stats.statements[statement] = stats.statements.get(statement, 0) + 1
+
+
+def instrument_engine(engine: AsyncEngine):
+    if event.contains(engine.sync_engine, 'after_cursor_execute', _after_cursor_execute):
+        return
+    event.listen(engine.sync_engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine.sync_engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+router = APIRouter()
+
+
+@router.get('/metrics', response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    return metrics.render()
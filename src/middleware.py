@@ -1,40 +1,183 @@
-from jwt import InvalidTokenError
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from src.user.utils import get_token_data
+import re
+import time
+from loguru import logger
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from src.user.utils import decode_token
 from src.user.exceptions import CredentialsException
+from src.sharding import shard_map, shard_proxy, FORWARDED_HEADER
+from src.metrics import metrics, current_request, RequestStats, OTHER_ROUTE
+from src.config import settings
 
 
-PUBLIC_ROUTES = (
+PUBLIC_ROUTES = frozenset((
     '/',
     '/token',
     '/users',
     '/docs',
     '/openapi.json',
-    '/favicon.ico'
+    '/favicon.ico',
+    '/metrics'
+))
+
+PUBLIC_PREFIXES = (
+    '/admin',
 )
 
+ROOM_CLOSE_REDIRECT = 4307
+# a close frame carries at most 125 bytes, two of them are the code
+MAX_CLOSE_REASON_BYTES = 123
 
-class AuthenticationMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path
-        if path in PUBLIC_ROUTES or path.startswith('/admin'):
-            return await call_next(request)
+# only these routes touch the live game state, the rest of /rooms is served by any worker from the database
+_live_room_path_pattern = re.compile(r'^/rooms/([0-9a-fA-F-]{36})/(?:start|game|actions|votes|ws)/?$')
+_public_prefix_pattern = re.compile('|'.join(re.escape(prefix) for prefix in PUBLIC_PREFIXES))
 
-        token = request.headers.get('Authorization')
-        if not token:
-            raise CredentialsException()
 
-        if token.startswith('Bearer'):
-            token = token[7:]
+def is_public_route(path: str) -> bool:
+    return path in PUBLIC_ROUTES or _public_prefix_pattern.match(path) is not None
 
-        try:
-            payload = await get_token_data(token)
-            username = payload.get('sub')
 
-            if username is None:
+def get_bearer_token(scope: Scope) -> str | None:
+    for name, value in scope['headers']:
+        if name == b'authorization':
+            token = value.decode('latin-1')
+            if token.startswith('Bearer'):
+                token = token[7:]
+            return token
+    return None
+
+
+class AuthenticationMiddleware:
+    """Validates the bearer token once and stores the decoded TokenData in scope['state']['token_data']."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or is_public_route(scope['path']):
+            await self.app(scope, receive, send)
+            return
+
+        token = get_bearer_token(scope)
+        try:
+            if not token:
                 raise CredentialsException()
-        except InvalidTokenError:
-            raise CredentialsException()
+            token_data = decode_token(token)
+        except CredentialsException as exc:
+            response = JSONResponse({'detail': exc.detail}, status_code=exc.status_code, headers=exc.headers)
+            await response(scope, receive, send)
+            return
+
+        scope.setdefault('state', {})['token_data'] = token_data
+        await self.app(scope, receive, send)
+
+
+class ShardingMiddleware:
+    """Sends requests for the live state of a room to the worker that owns it.
+
+    HTTP requests are forwarded to the owner and its response is relayed back.
+    Websockets are accepted and closed with ROOM_CLOSE_REDIRECT and the owner
+    websocket url as the reason. The query string carries the token and is never
+    echoed, clients reconnect with their own query string.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] not in ('http', 'websocket') or not shard_map.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        match = _live_room_path_pattern.match(scope['path'])
+        if match is None or shard_map.is_local(match.group(1).lower()) or is_forwarded(scope):
+            await self.app(scope, receive, send)
+            return
+
+        owner_url = shard_map.url_of(shard_map.owner(match.group(1).lower()))
+
+        if scope['type'] == 'http':
+            await shard_proxy.forward(scope, receive, send, owner_url)
+            return
+
+        await receive()
+        await send({'type': 'websocket.accept'})
+        await send({
+            'type': 'websocket.close',
+            'code': ROOM_CLOSE_REDIRECT,
+            'reason': redirect_reason(re.sub('^http', 'ws', owner_url), scope['path'])
+        })
+
+
+def is_forwarded(scope: Scope) -> bool:
+    return any(name == FORWARDED_HEADER for name, _ in scope['headers'])
+
+
+def redirect_reason(owner_url: str, path: str) -> str:
+    """Owner websocket url of the room, only the base url when the full one does not fit a close frame."""
+    for reason in (owner_url + path, owner_url):
+        if len(reason.encode()) <= MAX_CLOSE_REASON_BYTES:
+            return reason
+    return owner_url.encode()[:MAX_CLOSE_REASON_BYTES].decode(errors='ignore')
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and files it, with its DB queries, under the matched route template.
+
+    With SQL_DEBUG the query count and time are also sent in X-DB-Query-Count and
+    X-DB-Query-Time headers and logged, statements repeated SQL_REPEAT_THRESHOLD
+    times or more are logged as possible N+1 queries.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        parent = current_request.get()
+        request = RequestStats(settings.SQL_DEBUG or (parent is not None and parent.statements is not None))
+        token = current_request.set(request)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if settings.SQL_DEBUG:
+                    message['headers'] = [
+                        *message.get('headers', ()),
+                        (b'x-db-query-count', str(request.queries).encode()),
+                        (b'x-db-query-time', f'{request.query_seconds * 1000:.2f}'.encode()),
+                    ]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            metrics.observe_request(route_label(scope), status, time.perf_counter() - started, request)
+            if parent is not None:
+                parent.merge(request)
+            if settings.SQL_DEBUG:
+                log_queries(scope, request)
+
+
+def log_queries(scope: Scope, request: RequestStats):
+    logger.info(
+        f'{scope["method"]} {scope["path"]}: {request.queries} queries in {request.query_seconds * 1000:.2f} ms'
+    )
+    for statement, count in request.repeated(settings.SQL_REPEAT_THRESHOLD):
+        logger.warning(f'possible N+1 on {scope["method"]} {scope["path"]}: {count}x {" ".join(statement.split())}')
+
 
-        return await call_next(request)
+def route_label(scope: Scope) -> str:
+    route = scope.get('route')
+    if route is not None:
+        return route.path
+    if _public_prefix_pattern.match(scope['path']) is not None:
+        return PUBLIC_PREFIXES[0]
+    return OTHER_ROUTE
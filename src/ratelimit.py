@@ -0,0 +1,170 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from fastapi import HTTPException, status
+from loguru import logger
+from src.config import settings
+
+
+class TooManyRequestsException(HTTPException):
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts, try again later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+class RateLimit:
+    """Token bucket refilled with per_minute tokens a minute and holding at most burst tokens."""
+
+    __slots__ = ('name', 'rate', 'burst')
+
+    def __init__(self, name: str, per_minute: float, burst: int):
+        self.name = name
+        self.rate = per_minute / 60
+        self.burst = burst
+
+
+class RateLimiter(ABC):
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.rejected = 0
+
+    async def check(self, limit: RateLimit, key: str | None, cost: int = 1):
+        """Takes cost tokens from the bucket of key, raises 429 when the bucket is empty.
+
+        A cost of 0 only checks the bucket, for limits that are spent by record.
+        """
+        if not self.enabled or not key:
+            return
+
+        retry_after = await self._hit(f'{limit.name}:{key}', limit, cost)
+        if retry_after > 0:
+            self.rejected += 1
+            raise TooManyRequestsException(retry_after)
+
+    async def record(self, limit: RateLimit, key: str | None):
+        """Takes a token from the bucket of key without rejecting anything."""
+        if self.enabled and key:
+            await self._hit(f'{limit.name}:{key}', limit, 1)
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def _hit(self, key: str, limit: RateLimit, cost: int) -> float:
+        """Takes cost tokens from the bucket of key if it holds one, returns 0 or the seconds until it does."""
+
+
+class MemoryRateLimiter(RateLimiter):
+    """Buckets of this process, the least recently used ones are evicted past max_keys."""
+
+    def __init__(self, max_keys: int, enabled: bool = True):
+        super().__init__(enabled)
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def _hit(self, key: str, limit: RateLimit, cost: int) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = limit.burst
+        else:
+            tokens, updated = bucket
+            tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+            self._buckets.move_to_end(key)
+
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= cost
+        else:
+            retry_after = (1 - tokens) / limit.rate
+
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+# KEYS[1] bucket, ARGV rate per second, burst and cost. Uses the Redis clock so workers agree on time.
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - cost
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(retry_after)
+"""
+
+
+class RedisRateLimiter(RateLimiter):
+    """Buckets shared by every worker, kept in Redis and updated atomically by a Lua script.
+
+    Requests are let through when Redis is unreachable.
+    """
+
+    def __init__(self, url: str, prefix: str, enabled: bool = True):
+        super().__init__(enabled)
+        self._url = url
+        self._prefix = prefix
+        self._redis = None
+        self._script = None
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def _hit(self, key: str, limit: RateLimit, cost: int) -> float:
+        if self._redis is None:
+            import redis.asyncio as redis
+
+            self._redis = redis.from_url(self._url)
+            self._script = self._redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+        try:
+            retry_after = await self._script(keys=[f'{self._prefix}{key}'], args=[limit.rate, limit.burst, cost])
+        except Exception:
+            logger.exception(f'rate limiter is unavailable, letting {key} through')
+            return 0.0
+        return float(retry_after)
+
+
+def create_rate_limiter() -> RateLimiter:
+    if settings.RATE_LIMIT_BACKEND == 'redis':
+        return RedisRateLimiter(settings.REDIS_URL, settings.RATE_LIMIT_KEY_PREFIX, settings.RATE_LIMIT_ENABLED)
+    return MemoryRateLimiter(settings.RATE_LIMIT_MAX_KEYS, settings.RATE_LIMIT_ENABLED)
+
+
+LOGIN_PER_IP = RateLimit('login:ip', settings.RATE_LIMIT_IP_PER_MINUTE, settings.RATE_LIMIT_IP_BURST)
+# attempts on one username from one IP
+LOGIN_PER_USERNAME_IP = RateLimit(
+    'login:username-ip', settings.RATE_LIMIT_USERNAME_PER_MINUTE, settings.RATE_LIMIT_USERNAME_BURST
+)
+# failures on one username from anywhere, spent only by failed logins and with a larger burst,
+# so an attack spread over many IPs is limited without locking the user out after a few tries
+LOGIN_FAILURES_PER_USERNAME = RateLimit(
+    'login:username', settings.RATE_LIMIT_LOGIN_FAILURES_PER_MINUTE, settings.RATE_LIMIT_LOGIN_FAILURES_BURST
+)
+SIGNUP_PER_IP = RateLimit('signup:ip', settings.RATE_LIMIT_IP_PER_MINUTE, settings.RATE_LIMIT_IP_BURST)
+ROOM_PASSWORD_PER_IP = RateLimit('room:ip', settings.RATE_LIMIT_IP_PER_MINUTE, settings.RATE_LIMIT_IP_BURST)
+ROOM_PASSWORD_PER_USERNAME = RateLimit(
+    'room:username', settings.RATE_LIMIT_USERNAME_PER_MINUTE, settings.RATE_LIMIT_USERNAME_BURST
+)
+
+rate_limiter = create_rate_limiter()
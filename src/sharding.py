@@ -0,0 +1,141 @@
+import bisect
+import hashlib
+import httpx
+from loguru import logger
+from starlette.responses import JSONResponse
+from starlette.types import Receive, Scope, Send
+from src.config import settings
+
+
+# not forwarded in either direction, the body is sent whole so the length is set again
+HOP_BY_HOP_HEADERS = frozenset((
+    b'connection',
+    b'keep-alive',
+    b'proxy-authenticate',
+    b'proxy-authorization',
+    b'te',
+    b'trailers',
+    b'transfer-encoding',
+    b'upgrade',
+    b'host',
+    b'content-length',
+    b'content-encoding',
+))
+# set on forwarded requests, the receiving worker serves them even if it disagrees about the owner
+FORWARDED_HEADER = b'x-shard-forwarded'
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Consistent hash ring of worker nodes.
+
+    Every node is placed on the ring at several virtual points, a key belongs
+    to the first point clockwise from its hash. Adding a node only moves the
+    keys that fall right before its points.
+    """
+
+    def __init__(self, nodes: list[str], virtual_nodes: int):
+        self.nodes = sorted(set(nodes))
+        points = sorted(
+            (_hash(f'{node}#{index}'), node)
+            for node in self.nodes
+            for index in range(virtual_nodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, key: str) -> str | None:
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key))
+        return self._owners[index % len(self._hashes)]
+
+
+class ShardMap:
+    """Maps join codes to the worker that owns their live game state."""
+
+    def __init__(self, worker_id: str, nodes: dict[str, str], virtual_nodes: int):
+        self.worker_id = worker_id
+        self.nodes = nodes
+        self.ring = HashRing(list(nodes), virtual_nodes)
+
+    @property
+    def enabled(self) -> bool:
+        return len(self.nodes) > 1
+
+    def owner(self, join_code: str) -> str:
+        return self.ring.owner(join_code) or self.worker_id
+
+    def is_local(self, join_code: str) -> bool:
+        return not self.enabled or self.owner(join_code) == self.worker_id
+
+    def url_of(self, node: str) -> str:
+        return self.nodes[node]
+
+
+class ShardProxy:
+    """Forwards HTTP requests for rooms owned by another worker and relays the answer.
+
+    Headers, Authorization included, are passed on as they are, so the owner
+    authenticates the request itself.
+    """
+
+    def __init__(self, worker_id: str, timeout: float, transport: httpx.AsyncBaseTransport | None = None):
+        self.worker_id = worker_id
+        self.timeout = timeout
+        self.forwarded = 0
+        self.failed = 0
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+
+    async def forward(self, scope: Scope, receive: Receive, send: Send, base_url: str):
+        url = base_url + scope['path']
+        if scope['query_string']:
+            url += '?' + scope['query_string'].decode('latin-1')
+        headers = [(name, value) for name, value in scope['headers'] if name not in HOP_BY_HOP_HEADERS]
+        headers.append((FORWARDED_HEADER, self.worker_id.encode()))
+
+        try:
+            response = await self._get_client().request(
+                scope['method'], url, headers=headers, content=await _read_body(receive)
+            )
+        except httpx.HTTPError:
+            self.failed += 1
+            logger.exception(f'failed to forward {scope["method"]} {scope["path"]} to {base_url}')
+            response = JSONResponse({'detail': 'Room is unavailable, try again later'}, status_code=502)
+            await response(scope, receive, send)
+            return
+
+        self.forwarded += 1
+        headers = [
+            (name.lower(), value) for name, value in response.headers.raw if name.lower() not in HOP_BY_HOP_HEADERS
+        ]
+        headers.append((b'content-length', str(len(response.content)).encode()))
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': response.content})
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, transport=self._transport)
+        return self._client
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+shard_map = ShardMap(settings.WORKER_ID, settings.SHARD_NODE_URLS, settings.SHARD_VIRTUAL_NODES)
+shard_proxy = ShardProxy(settings.WORKER_ID, settings.SHARD_PROXY_TIMEOUT_SECONDS)
@@ -0,0 +1,26 @@
+from contextlib import contextmanager
+from src.metrics import current_request, RequestStats
+
+
+@contextmanager
+def assert_max_queries(max_queries: int):
+    """Fails when the wrapped block runs more than max_queries SQL statements.
+
+    Counts queries made directly and by requests served in the same context,
+    e.g. through httpx.AsyncClient(transport=ASGITransport(app)):
+
+        with assert_max_queries(3):
+            await client.get(f'/rooms/{join_code}')
+    """
+    stats = RequestStats(track_statements=True)
+    token = current_request.set(stats)
+    try:
+        yield stats
+    finally:
+        current_request.reset(token)
+
+    if stats.queries > max_queries:
+        statements = '\n'.join(
+            f'  {count}x {" ".join(statement.split())}' for statement, count in stats.statements.items()
+        )
+        raise AssertionError(f'expected at most {max_queries} queries, got {stats.queries}:\n{statements}')
@@ -1,2 +1,9 @@
 from .models import User, Profile
-from .utils import get_current_user, get_password_hash, verify_password
+from .cache import CachedUser
+from .utils import (
+    get_current_user,
+    get_password_hash,
+    verify_password,
+    get_password_hash_async,
+    verify_password_async,
+)
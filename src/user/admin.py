@@ -5,7 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqladmin.authentication import AuthenticationBackend
 from starlette.requests import Request
 from src.db import get_db
-from .utils import authenticate_user, create_access_token, get_token_data
+from .utils import authenticate_user, create_access_token, get_token_data, check_login_rate, record_login_failure, get_client_ip
 from .constants import ADMIN_SESSION_TOKEN_EXPIRES_MINUTES
 from .enums import RoleChoices
 
@@ -14,11 +14,15 @@ class AdminAuth(AuthenticationBackend):
     async def login(self, request: Request):
         form = await request.form()
         username, password = form['username'], form['password']
+        await check_login_rate(username, get_client_ip(request))
 
         async for db in get_db():
             user = await authenticate_user(db, username, password)
 
-        if user is None or user.role != RoleChoices.ADMIN.value:
+        if user is None:
+            await record_login_failure(username)
+            return False
+        if user.role != RoleChoices.ADMIN.value:
             return False
         
         access_token_expires = timedelta(minutes=ADMIN_SESSION_TOKEN_EXPIRES_MINUTES)
@@ -0,0 +1,106 @@
+import time
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from src.bus import event_bus
+from src.config import settings
+from .models import User
+
+
+USERS_CHANNEL = 'users'
+# session.info key of the usernames to drop once the session commits
+PENDING_INVALIDATIONS = 'user_cache_invalidations'
+
+
+class CachedUser:
+    """Detached copy of the User columns that authenticated requests need."""
+
+    __slots__ = ('id', 'username', 'email', 'role')
+
+    def __init__(self, id: int, username: str, email: str, role: str):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.role = role
+
+    @classmethod
+    def from_model(cls, user: User) -> 'CachedUser':
+        return cls(user.id, user.username, user.email, user.role)
+
+
+class UserCache:
+    """Bounded LRU of authenticated users keyed by username.
+
+    Entries expire after ttl_seconds. Every committed update or delete of a User
+    row drops its entry here and, through the event bus, on every other worker.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, CachedUser]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, username: str) -> CachedUser | None:
+        entry = self._entries.get(username)
+        if entry is None:
+            return None
+
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._entries[username]
+            return None
+
+        self._entries.move_to_end(username)
+        return user
+
+    def set(self, user: User) -> CachedUser:
+        cached = CachedUser.from_model(user)
+        self._entries[cached.username] = (time.monotonic() + self.ttl_seconds, cached)
+        self._entries.move_to_end(cached.username)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return cached
+
+    def invalidate(self, username: str):
+        self._entries.pop(username, None)
+        try:
+            event_bus.publish(USERS_CHANNEL, username)
+        except RuntimeError:
+            # no running event loop, e.g. a migration script, there is nobody to notify
+            pass
+
+    def clear(self):
+        self._entries.clear()
+
+    async def handle_event(self, channel: str, messages: list[str]):
+        if channel != USERS_CHANNEL:
+            return
+        for username in messages:
+            self._entries.pop(username, None)
+
+
+user_cache = UserCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _collect_invalidation(mapper, connection, target: User):
+    # invalidating at flush would let a request cache the old row again before the commit
+    state = inspect(target)
+    pending = state.session.info.setdefault(PENDING_INVALIDATIONS, set())
+    pending.update((target.username, *state.attrs.username.history.deleted))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session: Session):
+    for username in session.info.pop(PENDING_INVALIDATIONS, ()):
+        user_cache.invalidate(username)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_invalidations(session: Session):
+    session.info.pop(PENDING_INVALIDATIONS, None)
@@ -9,15 +9,15 @@ from .schemas import (
     ProfileCreateRequest,
 )
 from .service import user_service
-from .utils import get_current_user
-from .models import User
+from .utils import get_current_user, limit_login, limit_signup
+from .cache import CachedUser
 
 
 user_router = APIRouter(prefix='/users')
 token_router = APIRouter(prefix='/token')
 
 
-@token_router.post('')
+@token_router.post('', dependencies=[Depends(limit_login)])
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_db)
@@ -25,7 +25,12 @@ async def login_for_access_token(
     return await user_service.login(form_data, db)
 
 
-@user_router.post('', response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+@user_router.post(
+    '',
+    response_model=UserResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limit_signup)]
+)
 async def create_user(
     user_data: UserCreateRequest,
     db: AsyncSession = Depends(get_db)
@@ -36,7 +41,7 @@ async def create_user(
 @user_router.post('/profile')
 async def create_profile(
     profile_data: ProfileCreateRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: CachedUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     return await user_service.create_profile(profile_data, db, current_user)
@@ -44,7 +49,7 @@ async def create_profile(
 
 @user_router.get('/profile')
 async def get_profile(
-    current_user: User = Depends(get_current_user),
+    current_user: CachedUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     return await user_service.get_profile(current_user, db)
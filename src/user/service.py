@@ -13,7 +13,8 @@ from .schemas import (
     ProfileResponse,
 )
 from .models import User, Profile
-from .utils import get_password_hash, authenticate_user, create_access_token
+from .cache import CachedUser
+from .utils import get_password_hash_async, authenticate_user, create_access_token, record_login_failure
 from .exceptions import CredentialsException
 
 
@@ -29,11 +30,12 @@ class UserService:
         if user_exists:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='UserExists')
 
+        password = await get_password_hash_async(user_data.password)
         try:
             user = User(
                 username=user_data.username,
                 email=user_data.email,
-                password=get_password_hash(user_data.password)
+                password=password
             )
             db.add(user)
             await db.commit()
@@ -55,6 +57,7 @@ class UserService:
     async def login(form_data: OAuth2PasswordRequestForm, db: AsyncSession) -> Token:
         user = await authenticate_user(db, form_data.username, form_data.password)
         if not user:
+            await record_login_failure(form_data.username)
             raise CredentialsException()
         
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -69,7 +72,7 @@ class UserService:
     
     @staticmethod
     async def create_profile(
-        profile_data: ProfileCreateRequest, db: AsyncSession, user: User
+        profile_data: ProfileCreateRequest, db: AsyncSession, user: CachedUser
     ) -> ProfileResponse:
         query = select(Profile).where(Profile.user_id == user.id)
         result = await db.execute(query)
@@ -93,7 +96,7 @@ class UserService:
         )
     
     @staticmethod
-    async def get_profile(user: User, db: AsyncSession) -> ProfileResponse:
+    async def get_profile(user: CachedUser, db: AsyncSession) -> ProfileResponse:
         query = select(Profile).where(Profile.user_id == user.id)
         result = await db.execute(query)
         profile = result.scalar_one_or_none()
@@ -1,30 +1,153 @@
+import asyncio
+import time
 import jwt
+from concurrent.futures import ThreadPoolExecutor
 from loguru import logger
 from datetime import timedelta, datetime, timezone
 from jwt.exceptions import InvalidTokenError
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import Depends
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import Depends, Request
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from passlib.context import CryptContext
 from src.config import settings
 from src.db import get_db
+from src.metrics import metrics
+from src.ratelimit import rate_limiter, LOGIN_PER_IP, LOGIN_PER_USERNAME_IP, LOGIN_FAILURES_PER_USERNAME, SIGNUP_PER_IP
 from .models import User
-from .exceptions import CredentialsException
+from .cache import user_cache, CachedUser
+from .exceptions import CredentialsException, ServerBusyException
 from .schemas import TokenData
 
 
-password_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+def create_password_context() -> CryptContext:
+    schemes = [scheme.strip() for scheme in settings.PASSWORD_SCHEMES.split(',') if scheme.strip()]
+    options = {}
+    if 'bcrypt' in schemes:
+        options.update(
+            bcrypt__default_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+            bcrypt__min_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+            bcrypt__max_rounds=settings.PASSWORD_BCRYPT_ROUNDS
+        )
+    return CryptContext(schemes=schemes, deprecated='auto', **options)
+
+
+password_context = create_password_context()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='token')
 
 
 def verify_password(plain_password: str, hashed_password: str):
     return password_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return password_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password):
     return password_context.hash(password)
 
 
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool so hashing never blocks the event loop."""
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hasher')
+        self.max_workers = max_workers
+        self.max_pending = max_workers + max_queue
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.hash_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning(f'password hasher queue is full ({self.pending} pending)')
+            raise ServerBusyException()
+
+        self.pending += 1
+        submitted = time.perf_counter()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._executor, self._timed, func, *args)
+        except BaseException:
+            self.pending -= 1
+            raise
+        # released when the thread is done, a cancelled caller does not free the slot of running work
+        future.add_done_callback(self._release)
+        result, started, finished = await asyncio.shield(future)
+
+        # counters are only touched from the event loop thread
+        self.wait_seconds += started - submitted
+        self.hash_seconds += finished - started
+        self.completed += 1
+        metrics.password_hash.observe(finished - started)
+        return result
+
+    def _release(self, future: asyncio.Future):
+        self.pending -= 1
+        if not future.cancelled():
+            # marks the error as retrieved when the caller was cancelled before it
+            future.exception()
+
+    @staticmethod
+    def _timed(func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        return result, started, time.perf_counter()
+
+    def metrics(self) -> dict:
+        return {
+            'workers': self.max_workers,
+            'pending': self.pending,
+            'queued': max(0, self.pending - self.max_workers),
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'hash_seconds': self.hash_seconds,
+            'wait_seconds': self.wait_seconds,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+async def verify_and_update_password_async(
+    plain_password: str,
+    hashed_password: str
+) -> tuple[bool, str | None]:
+    return await password_hasher.run(verify_and_update_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.run(get_password_hash, password)
+
+
+def get_client_ip(request: Request) -> str | None:
+    return request.client.host if request.client else None
+
+
+async def check_login_rate(username: str, client_ip: str | None):
+    """Raises 429 when the IP, the username from that IP or the username as a whole is out of login attempts."""
+    await rate_limiter.check(LOGIN_PER_IP, client_ip)
+    await rate_limiter.check(LOGIN_PER_USERNAME_IP, f'{username.lower()}@{client_ip}')
+    await rate_limiter.check(LOGIN_FAILURES_PER_USERNAME, username.lower(), cost=0)
+
+
+async def record_login_failure(username: str):
+    await rate_limiter.record(LOGIN_FAILURES_PER_USERNAME, username.lower())
+
+
+async def limit_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    await check_login_rate(form_data.username, get_client_ip(request))
+
+async def limit_signup(request: Request):
+    await rate_limiter.check(SIGNUP_PER_IP, get_client_ip(request))
+
+
 async def get_user(db: AsyncSession, username: str | None) -> User | None:
     query = select(User).where(User.username == username)
     result = await db.execute(query)
@@ -34,8 +157,17 @@ async def authenticate_user(db: AsyncSession, username: str, password: str) -> U
     user = await get_user(db, username)
     if not user:
         return
-    if not verify_password(password, user.password):
+
+    verified, new_hash = await verify_and_update_password_async(password, user.password)
+    if not verified:
         return
+    if new_hash is not None:
+        try:
+            user.password = new_hash
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            logger.exception(f'failed to store rehashed password of {username}')
     
     return user
 
@@ -53,26 +185,38 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     return encoded_jwt
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
-    try:
-        payload = await get_token_data(token)
-        username = payload.get('sub')
-        role = payload.get('role')
+async def get_current_user(
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> CachedUser:
+    token_data = getattr(request.state, 'token_data', None)
+    if token_data is None:
+        token_data = decode_token(token)
 
-        if username is None:
-            raise CredentialsException()
-        token_data = TokenData(username=username, role=role)
-    except InvalidTokenError:
-        raise CredentialsException()
-    
-    user = await get_user(db, username=token_data.username)
+    user = user_cache.get(token_data.username)
     if user is None:
-        logger.error(f'user {token_data.username} not found')
-        raise CredentialsException()
+        instance = await get_user(db, username=token_data.username)
+        if instance is None:
+            logger.error(f'user {token_data.username} not found')
+            raise CredentialsException()
+        user = user_cache.set(instance)
     
     logger.info(f'request accepted from user {token_data.username}')
     return user
 
 
+def decode_token(token: str) -> TokenData:
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except InvalidTokenError:
+        raise CredentialsException()
+
+    username = payload.get('sub')
+    if username is None:
+        raise CredentialsException()
+    return TokenData(username=username, role=payload.get('role'))
+
+
 async def get_token_data(token: str) -> dict:
     return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
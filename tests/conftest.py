@@ -0,0 +1,67 @@
+import os
+
+# the suite creates and drops its own database on the server from the DB_* settings
+os.environ.setdefault('DB_NAME', 'mafia_test')
+
+import pytest
+from sqlalchemy import text
+from src.config import settings
+from src.db import engine, Base, SessionLocal
+from src.metrics import instrument_engine
+from src.user import models as user_models  # noqa: F401
+from src.user.cache import user_cache
+from src.game import models as game_models  # noqa: F401
+from src.game.cache import room_detail_cache, rool_set_cache
+
+
+@pytest.fixture(scope='session')
+def anyio_backend():
+    return 'asyncio'
+
+
+async def _execute_on_server(statement: str):
+    import asyncpg
+
+    connection = await asyncpg.connect(
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        database='postgres',
+        timeout=5
+    )
+    try:
+        await connection.execute(statement)
+    finally:
+        await connection.close()
+
+
+@pytest.fixture(scope='session')
+async def database(anyio_backend):
+    """Fresh schema in a disposable database, tests using it are skipped when Postgres is not reachable."""
+    try:
+        await _execute_on_server(f'DROP DATABASE IF EXISTS "{settings.DB_NAME}" WITH (FORCE)')
+    except (OSError, TimeoutError) as exc:
+        pytest.skip(f'Postgres is not available: {exc}')
+
+    await _execute_on_server(f'CREATE DATABASE "{settings.DB_NAME}"')
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    # counted for assert_max_queries, the app does the same on import
+    instrument_engine(engine)
+    yield
+    await engine.dispose()
+    await _execute_on_server(f'DROP DATABASE IF EXISTS "{settings.DB_NAME}" WITH (FORCE)')
+
+
+@pytest.fixture
+async def db(database):
+    async with SessionLocal() as session:
+        yield session
+
+    tables = ', '.join(table.name for table in Base.metadata.sorted_tables)
+    async with engine.begin() as connection:
+        await connection.execute(text(f'TRUNCATE {tables} RESTART IDENTITY CASCADE'))
+    room_detail_cache.clear()
+    rool_set_cache.invalidate()
+    user_cache.clear()
@@ -0,0 +1,68 @@
+from itertools import count
+from uuid import uuid4
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.user.models import User
+from src.game.models import Room, RoolSet, UserRoom
+from src.game.enums import RoomType, GamePhase, ActionType
+from src.game.state import RoomState
+
+
+_sequence = count(1)
+
+
+async def create_user(db: AsyncSession, **values) -> User:
+    number = next(_sequence)
+    values.setdefault('username', f'player{number}')
+    values.setdefault('email', f'player{number}@example.com')
+    # never verified by the tests, a real hash would only cost bcrypt time
+    values.setdefault('password', 'not-a-hash')
+    user = User(**values)
+    db.add(user)
+    await db.commit()
+    return user
+
+
+async def create_rool_set(db: AsyncSession, **values) -> RoolSet:
+    values.setdefault('name', f'rool set {next(_sequence)}')
+    rool_set = RoolSet(**values)
+    db.add(rool_set)
+    await db.commit()
+    return rool_set
+
+
+async def create_room(db: AsyncSession, creator: User, rool_set: RoolSet, **values) -> Room:
+    values.setdefault('type_', RoomType.PUBLIC.value)
+    values.setdefault('join_code', uuid4())
+    room = Room(creator_id=creator.id, rool_set_id=rool_set.id, **values)
+    db.add(room)
+    await db.commit()
+    return room
+
+
+async def add_player(db: AsyncSession, room: Room, user: User):
+    db.add(UserRoom(user_id=user.id, room_id=room.id, is_creator=user.id == room.creator_id))
+    room.player_count += 1
+    await db.commit()
+
+
+def room_state(
+    abilities: list[ActionType],
+    mafia_seats: tuple[int, ...] = (),
+    phase: GamePhase = GamePhase.NIGHT
+) -> RoomState:
+    """Running game with players 101, 102, ... seated in order."""
+    number = next(_sequence)
+    state = RoomState(
+        number,
+        str(uuid4()),
+        1,
+        600,
+        300,
+        [101 + seat for seat in range(len(abilities))],
+        [None] * len(abilities),
+        list(abilities),
+        sum(1 << seat for seat in mafia_seats)
+    )
+    state.phase = phase
+    state.round = 1
+    return state
@@ -0,0 +1,110 @@
+import time
+import pytest
+from src.game.engine import GameEngine
+from src.game.enums import ActionType, GamePhase, GameWinner
+from src.game.exceptions import GameActionException
+from tests.factories import room_state
+
+
+KILL, SAVE, NONE = ActionType.KILL, ActionType.SAVE, ActionType.NO_ACTION
+
+
+def test_night_moves_to_day_of_the_same_round():
+    engine = GameEngine()
+    state = room_state([KILL, SAVE, NONE, NONE, NONE, NONE], mafia_seats=(0,))
+    state.actions[0] = (KILL, 5)
+
+    [result] = engine.advance_many([state])
+
+    assert result.previous_phase == GamePhase.NIGHT
+    assert result.deaths == [106]
+    assert state.phase == GamePhase.DAY
+    assert state.round == 1
+    assert state.actions == {}
+    assert state.deadline == pytest.approx(time.time() + state.day_duration, abs=5)
+
+
+def test_day_moves_to_the_next_night():
+    engine = GameEngine()
+    state = room_state([KILL, NONE, NONE, NONE, NONE], mafia_seats=(0,), phase=GamePhase.DAY)
+    state.tally.cast(0, 1)
+    state.tally.cast(2, 1)
+
+    [result] = engine.advance_many([state])
+
+    assert result.deaths == [102]
+    assert state.phase == GamePhase.NIGHT
+    assert state.round == 2
+    assert len(state.tally) == 0
+    assert state.winner is None
+
+
+def test_town_wins_when_the_last_mafia_is_lynched():
+    engine = GameEngine()
+    state = room_state([KILL, NONE, NONE, NONE], mafia_seats=(0,), phase=GamePhase.DAY)
+    for voter in (1, 2, 3):
+        state.tally.cast(voter, 0)
+
+    engine.advance_many([state])
+
+    assert state.phase == GamePhase.FINISHED
+    assert state.winner == GameWinner.TOWN
+    assert state.deadline == 0.0
+
+
+def test_mafia_wins_when_it_is_no_longer_outnumbered():
+    engine = GameEngine()
+    state = room_state([KILL, NONE, NONE], mafia_seats=(0,))
+    state.actions[0] = (KILL, 1)
+
+    engine.advance_many([state])
+
+    assert state.phase == GamePhase.FINISHED
+    assert state.winner == GameWinner.MAFIA
+
+
+def test_game_goes_on_while_town_outnumbers_mafia():
+    engine = GameEngine()
+    state = room_state([KILL, SAVE, NONE, NONE, NONE], mafia_seats=(0,))
+    state.actions[0] = (KILL, 2)
+    state.actions[1] = (SAVE, 2)
+
+    engine.advance_many([state])
+
+    assert state.phase == GamePhase.DAY
+    assert state.winner is None
+    assert state.alive_count == 5
+
+
+def test_batch_resolves_every_room_on_its_own():
+    engine = GameEngine()
+    night = room_state([KILL, NONE, NONE, NONE, NONE], mafia_seats=(0,))
+    night.actions[0] = (KILL, 4)
+    day = room_state([KILL, NONE, NONE, NONE, NONE], mafia_seats=(0,), phase=GamePhase.DAY)
+    quiet = room_state([KILL, NONE, NONE, NONE, NONE], mafia_seats=(0,))
+    finishing = room_state([KILL, NONE, NONE], mafia_seats=(0,))
+    finishing.actions[0] = (KILL, 2)
+
+    results = engine.advance_many([night, day, quiet, finishing])
+
+    assert [result.state for result in results] == [night, day, quiet, finishing]
+    assert [result.deaths for result in results] == [[105], [], [], [103]]
+    assert [state.phase for state in (night, day, quiet, finishing)] == [
+        GamePhase.DAY, GamePhase.NIGHT, GamePhase.DAY, GamePhase.FINISHED
+    ]
+    assert finishing.winner == GameWinner.MAFIA
+
+
+def test_dead_players_cannot_act_or_vote():
+    engine = GameEngine()
+    state = room_state([KILL, NONE, NONE, NONE, NONE], mafia_seats=(0,))
+    state.alive &= ~(1 << 0)
+
+    with pytest.raises(GameActionException):
+        engine.submit_action(state, 101, KILL, 102)
+
+    state.phase = GamePhase.DAY
+    with pytest.raises(GameActionException):
+        engine.cast_vote(state, 101, 102)
+    with pytest.raises(GameActionException):
+        engine.cast_vote(state, 102, 101)
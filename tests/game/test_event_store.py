@@ -0,0 +1,120 @@
+import asyncio
+import pytest
+from sqlalchemy import select, func, delete
+from src.db import engine
+from src.game.enums import ActionType, GameEventType
+from src.game.event_store import GameEventStore
+from src.game.models import GameEvent, Room
+from tests.factories import create_user, create_rool_set, create_room, room_state
+
+
+pytestmark = pytest.mark.anyio
+
+
+class BrokenEngine:
+
+    def connect(self):
+        return self
+
+    async def __aenter__(self):
+        await asyncio.sleep(0)
+        raise ConnectionError('database is gone')
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+def any_state():
+    return room_state([ActionType.KILL, ActionType.NO_ACTION, ActionType.NO_ACTION, ActionType.NO_ACTION])
+
+
+async def settle(store: GameEventStore):
+    while store._flushes:
+        await asyncio.gather(*store._flushes)
+
+
+async def test_size_trigger_fires_again_after_a_failed_flush(db, monkeypatch):
+    user = await create_user(db)
+    room = await create_room(db, user, await create_rool_set(db))
+    state = any_state()
+    state.room_id = room.id
+    store = GameEventStore(max_buffer=100, flush_size=5, flush_interval=0)
+
+    monkeypatch.setattr('src.game.event_store.engine', BrokenEngine())
+    for _ in range(5):
+        store.record(state, GameEventType.VOTE)
+    await settle(store)
+    assert len(store) == 5
+    assert store.written == 0
+
+    monkeypatch.setattr('src.game.event_store.engine', engine)
+    store.record(state, GameEventType.VOTE)
+    await settle(store)
+
+    assert len(store) == 0
+    assert store.written == 6
+    assert await db.scalar(select(func.count()).select_from(GameEvent)) == 6
+
+
+async def test_failed_flush_drops_the_oldest_events_past_max_buffer(monkeypatch):
+    monkeypatch.setattr('src.game.event_store.engine', BrokenEngine())
+    state = any_state()
+    store = GameEventStore(max_buffer=8, flush_size=100, flush_interval=0)
+    for actor_id in range(6):
+        store.record(state, GameEventType.VOTE, actor_id=actor_id)
+
+    flush = asyncio.create_task(store.flush())
+    await asyncio.sleep(0)
+    for actor_id in range(6, 11):
+        store.record(state, GameEventType.VOTE, actor_id=actor_id)
+    await flush
+
+    assert len(store) == 8
+    assert store.dropped == 3
+    assert [record[5] for record in store._buffer] == [3, 4, 5, 6, 7, 8, 9, 10]
+
+
+async def test_size_trigger_waits_for_the_interval_after_a_failure(monkeypatch):
+    monkeypatch.setattr('src.game.event_store.engine', BrokenEngine())
+    state = any_state()
+    store = GameEventStore(max_buffer=100, flush_size=2, flush_interval=60)
+    store.record(state, GameEventType.VOTE)
+    store.record(state, GameEventType.VOTE)
+    await settle(store)
+
+    store.record(state, GameEventType.VOTE)
+
+    assert not store._flushes
+    assert len(store) == 3
+
+
+async def test_events_of_deleted_rooms_are_dropped_instead_of_requeued(db):
+    user, rool_set = await create_user(db), await create_rool_set(db)
+    gone, kept = any_state(), any_state()
+    gone.room_id = (await create_room(db, user, rool_set)).id
+    kept.room_id = (await create_room(db, user, rool_set)).id
+    await db.execute(delete(Room).where(Room.id == gone.room_id))
+    await db.commit()
+    store = GameEventStore(max_buffer=100, flush_size=100, flush_interval=0)
+
+    for state in (gone, kept, gone, kept):
+        store.record(state, GameEventType.VOTE)
+    await store.flush()
+
+    assert len(store) == 0
+    assert store.written == 2
+    assert store.dropped == 2
+    assert await db.scalar(select(func.count()).select_from(GameEvent).where(GameEvent.room_id == kept.room_id)) == 2
+
+
+async def test_batch_failing_for_other_reasons_is_not_requeued(database, monkeypatch):
+    async def copy(connection, records):
+        raise ValueError('bad record')
+
+    store = GameEventStore(max_buffer=100, flush_size=100, flush_interval=0)
+    monkeypatch.setattr(store, '_copy', copy)
+    store.record(any_state(), GameEventType.VOTE)
+    await store.flush()
+
+    assert len(store) == 0
+    assert store.dropped == 1
@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from src.game.hub import RoomHub
+
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeSocket:
+
+    def __init__(self, stalled: bool = False):
+        self.stalled = stalled
+        self.sent = []
+        self.close_code = None
+
+    async def send_text(self, message: str):
+        if self.stalled:
+            await asyncio.Event().wait()
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_stalled_socket_does_not_hold_up_delivery(monkeypatch):
+    monkeypatch.setattr('src.game.hub.SEND_TIMEOUT_SECONDS', 60)
+    hub = RoomHub()
+    stalled, fast, other_room = FakeSocket(stalled=True), FakeSocket(), FakeSocket()
+    hub.subscribe('a', 1, stalled)
+    hub.subscribe('a', 2, fast)
+    hub.subscribe('b', 3, other_room)
+
+    await asyncio.wait_for(hub.deliver('room:a', ['one', 'two']), 0.1)
+    await asyncio.wait_for(hub.deliver('room:b', ['three']), 0.1)
+    await settle()
+
+    assert fast.sent == ['one', 'two']
+    assert other_room.sent == ['three']
+    assert hub.connection_count == 3
+    for join_code, websocket in (('a', stalled), ('a', fast), ('b', other_room)):
+        hub.unsubscribe(join_code, websocket)
+
+
+async def test_socket_that_times_out_is_closed(monkeypatch):
+    monkeypatch.setattr('src.game.hub.SEND_TIMEOUT_SECONDS', 0.01)
+    hub = RoomHub()
+    stalled = FakeSocket(stalled=True)
+    hub.subscribe('a', 1, stalled)
+
+    await hub.deliver('room:a', ['one'])
+    await asyncio.sleep(0.05)
+
+    assert hub.connection_count == 0
+    assert stalled.close_code == 1013
+
+
+async def test_socket_that_falls_behind_is_closed(monkeypatch):
+    monkeypatch.setattr('src.game.hub.SEND_TIMEOUT_SECONDS', 60)
+    monkeypatch.setattr('src.game.hub.SEND_QUEUE_SIZE', 3)
+    hub = RoomHub()
+    stalled, fast = FakeSocket(stalled=True), FakeSocket()
+    hub.subscribe('a', 1, stalled)
+    hub.subscribe('a', 2, fast)
+
+    for message in ('one', 'two', 'three', 'four', 'five'):
+        await hub.deliver('room:a', [message])
+        await settle()
+
+    assert stalled.close_code == 1013
+    assert hub.connection_count == 1
+    assert fast.sent == ['one', 'two', 'three', 'four', 'five']
+    hub.unsubscribe('a', fast)
+
+
+async def test_private_messages_reach_only_their_user():
+    hub = RoomHub()
+    first, second = FakeSocket(), FakeSocket()
+    hub.subscribe('a', 1, first)
+    hub.subscribe('a', 2, second)
+
+    await hub.deliver('room:a:2', ['secret'])
+    await settle()
+
+    assert first.sent == []
+    assert second.sent == ['secret']
+    hub.unsubscribe('a', first)
+    hub.unsubscribe('a', second)
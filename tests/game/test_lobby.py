@@ -0,0 +1,60 @@
+from base64 import urlsafe_b64encode
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import HTTPException
+from src.game.service import RoomService
+from tests.factories import create_user, create_rool_set, create_room
+
+
+def encode(text: str) -> str:
+    return urlsafe_b64encode(text.encode()).decode()
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+    cursor = RoomService._encode_cursor(created_at, 42)
+
+    assert RoomService._decode_cursor(cursor) == (created_at, 42)
+
+
+@pytest.mark.parametrize('cursor', [
+    '',
+    'not a cursor!',
+    encode('2025-05-01T12:30:15+00:00'),
+    encode('2025-05-01T12:30:15+00:00|1|2'),
+    encode('yesterday|1'),
+    encode('2025-05-01T12:30:15+00:00|one'),
+    encode('2025-05-01T12:30:15|1'),
+    encode('2025-05-01T12:30:15+00:00|0'),
+    encode('2025-05-01T12:30:15+00:00|-1'),
+    encode(f'2025-05-01T12:30:15+00:00|{2 ** 31}'),
+    urlsafe_b64encode(b'\xff\xfe|1').decode(),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        RoomService._decode_cursor(cursor)
+
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize('room_count', [4, 5])
+async def test_pages_split_rooms_created_at_the_same_time(db, room_count):
+    creator = await create_user(db)
+    rool_set = await create_rool_set(db)
+    created_at = datetime(2025, 5, 1, tzinfo=timezone.utc)
+    rooms = [await create_room(db, creator, rool_set, created_at=created_at) for _ in range(room_count)]
+    rooms.append(await create_room(db, creator, rool_set, created_at=created_at - timedelta(seconds=1)))
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = await RoomService.list_rooms(db, cursor=cursor, limit=2)
+        seen.extend(room.id for room in page.rooms)
+        pages += 1
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert seen == [room.id for room in sorted(rooms, key=lambda room: (room.created_at, room.id), reverse=True)]
+    assert pages == (len(rooms) + 1) // 2
@@ -0,0 +1,79 @@
+import pytest
+from src.game.hub import encode_event
+from src.game.matchmaking import FillIndex
+from src.game.schemas import RoomCreateRequest
+from src.game.service import RoomService
+from tests.factories import create_user, create_rool_set
+
+
+pytestmark = pytest.mark.anyio
+
+
+def test_best_returns_fullest_rooms_first():
+    index = FillIndex()
+    index.update('a', 1, 2, 10)
+    index.update('b', 1, 7, 10)
+    index.update('c', 2, 5, 10)
+    index.update('d', 1, 10, 10)
+
+    assert index.best(None, 5) == ['b', 'c', 'a']
+    assert index.best(1, 5) == ['b', 'a']
+    assert index.best(3, 5) == []
+    assert 'd' not in index
+
+
+def test_heaps_are_compacted_against_their_own_rooms():
+    index = FillIndex()
+    for number in range(1000):
+        index.update(f'big{number}', 1, 1, 10)
+    index.update('small', 2, 1, 10)
+
+    for count in range(1, 9):
+        for _ in range(50):
+            index.update('small', 2, count, 10)
+
+    assert len(index._heaps[2]) <= 2 * 1 + 64 + 1
+    assert index.best(2, 5) == ['small']
+
+
+def test_remove_compacts_stale_entries():
+    index = FillIndex()
+    for number in range(500):
+        index.update(f'room{number}', 1, 1, 10)
+    for number in range(500):
+        index.remove(f'room{number}')
+
+    assert len(index) == 0
+    assert sum(len(heap) for heap in index._heaps.values()) <= 2 * 65
+    assert index.best(None, 5) == []
+    assert 1 not in index._sizes
+
+
+async def test_rooms_created_on_other_workers_are_indexed():
+    index = FillIndex()
+    created = encode_event('room_created', {'rool_set_id': 3, 'player_count': 1, 'player_limit': 8})
+    joined = encode_event('player_joined', {'user_id': 7, 'username': 'seven', 'player_count': 2})
+
+    await index.handle_event('room:other', [joined])
+    assert 'other' not in index
+
+    await index.handle_event('room:other', [created, joined])
+    assert index.best(3, 5) == ['other']
+    assert index._rooms['other'][2] == 2
+
+    await index.handle_event('room:other', [encode_event('game_started', {})])
+    assert 'other' not in index
+
+
+async def test_created_rooms_are_announced_to_other_workers(db, monkeypatch):
+    published = []
+    monkeypatch.setattr('src.game.service.room_hub.publish', lambda *event: published.append(event))
+    user = await create_user(db)
+    rool_set = await create_rool_set(db)
+
+    room = await RoomService.create(RoomCreateRequest(rool_set_id=rool_set.id, player_limit=6), db, user)
+
+    index = FillIndex()
+    for join_code, event, data in published:
+        await index.handle_event(f'room:{join_code}', [encode_event(event, data)])
+    assert index.best(rool_set.id, 5) == [str(room.join_code)]
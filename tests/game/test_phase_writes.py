@@ -0,0 +1,150 @@
+import pytest
+from sqlalchemy import select, delete
+from src.game.engine import game_engine
+from src.game.enums import ActionType, GamePhase
+from src.game.models import Room, GameSnapshot
+from src.game.scheduler import phase_scheduler
+from src.game.service import GameService, phase_backlog
+from src.game.state import PhaseResult
+from tests.factories import create_user, create_rool_set, create_room, room_state
+
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeSession:
+
+    def __init__(self):
+        self.rollbacks = 0
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Batches passed to _persist_phases, the write fails while writes.failing is set."""
+
+    class Writes(list):
+        failing = False
+
+    writes = Writes()
+
+    async def persist_phases(results, db):
+        if writes.failing:
+            raise ConnectionError('database is gone')
+        writes.append({result.state.join_code: list(result.deaths) for result in results})
+
+    monkeypatch.setattr(GameService, '_persist_phases', persist_phases)
+    yield writes
+    phase_backlog.take()
+
+
+def night_result(victim: int) -> PhaseResult:
+    state = room_state([ActionType.KILL, ActionType.NO_ACTION, ActionType.NO_ACTION, ActionType.NO_ACTION])
+    result = PhaseResult(state, GamePhase.NIGHT)
+    result.deaths.append(state.user_ids[victim])
+    state.phase = GamePhase.DAY
+    return result
+
+
+async def test_failed_write_is_kept_and_written_with_the_next_batch(writes):
+    db = FakeSession()
+    first, second = night_result(1), night_result(2)
+
+    writes.failing = True
+    assert not await GameService._write_phases([first], db)
+    assert db.rollbacks == 1
+    assert len(phase_backlog) == 1
+
+    writes.failing = False
+    assert await GameService._write_phases([second], db)
+    assert writes == [{first.state.join_code: [102], second.state.join_code: [103]}]
+    assert len(phase_backlog) == 0
+
+
+async def test_backlog_merges_deaths_of_one_room(writes):
+    db = FakeSession()
+    night = night_result(1)
+    day = PhaseResult(night.state, GamePhase.DAY)
+    day.deaths.append(104)
+
+    writes.failing = True
+    await GameService._write_phases([night], db)
+    await GameService._write_phases([day], db)
+    writes.failing = False
+    await GameService._write_phases([], db)
+
+    assert writes == [{night.state.join_code: [102, 104]}]
+
+
+async def test_backlog_is_retried_in_the_background(writes, monkeypatch):
+    monkeypatch.setattr('src.game.service.PHASE_WRITE_RETRY_SECONDS', 0)
+    writes.failing = True
+    result = night_result(3)
+    await GameService._write_phases([result], FakeSession())
+
+    attempts = []
+
+    async def persist_phases(results, db):
+        attempts.append(len(results))
+        if len(attempts) < 3:
+            raise ConnectionError('database is gone')
+
+    monkeypatch.setattr(GameService, '_persist_phases', persist_phases)
+    GameService._retry_phases_later()
+    await phase_backlog.retry
+
+    assert attempts == [1, 1, 1]
+    assert len(phase_backlog) == 0
+
+
+async def test_game_of_a_deleted_room_does_not_block_the_others(db):
+    creator, rool_set = await create_user(db), await create_rool_set(db)
+    rooms = [await create_room(db, creator, rool_set) for _ in range(2)]
+    results = []
+    for room in rooms:
+        result = night_result(1)
+        result.state.room_id = room.id
+        result.state.join_code = str(room.join_code)
+        game_engine.add(result.state)
+        phase_scheduler.schedule(result.state.join_code, result.state.deadline)
+        results.append(result)
+    gone, kept = results
+    await db.execute(delete(Room).where(Room.id == gone.state.room_id))
+    await db.commit()
+
+    try:
+        assert await GameService._write_phases(results, db)
+
+        assert len(phase_backlog) == 0
+        assert gone.state.join_code not in game_engine
+        assert gone.state.join_code not in phase_scheduler
+        assert kept.state.join_code in game_engine
+        assert await db.scalar(select(Room.phase).where(Room.id == kept.state.room_id)) == GamePhase.DAY.value
+    finally:
+        for result in results:
+            game_engine.remove(result.state.join_code)
+            phase_scheduler.cancel(result.state.join_code)
+
+
+async def test_snapshot_skips_games_of_deleted_rooms(db):
+    creator, rool_set = await create_user(db), await create_rool_set(db)
+    rooms = [await create_room(db, creator, rool_set) for _ in range(2)]
+    states = []
+    for room in rooms:
+        state = night_result(1).state
+        state.room_id = room.id
+        state.join_code = str(room.join_code)
+        game_engine.add(state)
+        states.append(state)
+    await db.execute(delete(Room).where(Room.id == states[0].room_id))
+    await db.commit()
+
+    try:
+        await GameService.snapshot(db)
+    finally:
+        for state in states:
+            game_engine.remove(state.join_code)
+
+    assert await db.scalar(select(GameSnapshot.room_id)) == states[1].room_id
@@ -0,0 +1,64 @@
+import pytest
+from src.game.enums import RoomType
+from src.game.service import RoomService
+from src.testing import assert_max_queries
+from src.user.utils import get_password_hash
+from tests.factories import create_user, create_rool_set, create_room, add_player
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_get_room_does_not_query_per_player(db):
+    creator = await create_user(db)
+    room = await create_room(db, creator, await create_rool_set(db))
+    for _ in range(5):
+        await add_player(db, room, await create_user(db))
+    join_code = str(room.join_code)
+
+    # room with its players, then the rool set with its roles
+    with assert_max_queries(3):
+        response = await RoomService.get_room(join_code, db, creator)
+    assert response.player_count == 5
+    assert len(response.players) == 5
+
+    # served from the detail cache
+    with assert_max_queries(0):
+        await RoomService.get_room(join_code, db, creator)
+
+
+async def test_list_rooms_is_one_query_per_page(db):
+    creator = await create_user(db)
+    rool_sets = [await create_rool_set(db) for _ in range(3)]
+    for index in range(12):
+        await create_room(db, creator, rool_sets[index % 3])
+
+    with assert_max_queries(1):
+        page = await RoomService.list_rooms(db, limit=5)
+    assert len(page.rooms) == 5
+
+    with assert_max_queries(1):
+        page = await RoomService.list_rooms(db, rool_set_id=rool_sets[0].id, has_open_seats=True, cursor=page.next_cursor)
+    assert page.rooms
+
+
+async def test_join_public_room_claims_the_seat_in_one_statement(db):
+    room = await create_room(db, await create_user(db), await create_rool_set(db))
+    player = await create_user(db)
+
+    with assert_max_queries(1):
+        assert await RoomService.join_room(str(room.join_code), db, player)
+
+
+async def test_join_private_room_checks_the_password_before_claiming(db):
+    room = await create_room(
+        db,
+        await create_user(db),
+        await create_rool_set(db),
+        type_=RoomType.PRIVATE.value,
+        password=get_password_hash('secret')
+    )
+    player = await create_user(db)
+
+    with assert_max_queries(3):
+        assert await RoomService.join_room(str(room.join_code), db, player, password='secret', client_ip='10.0.0.1')
@@ -0,0 +1,95 @@
+from src.game.enums import ActionType
+from src.game.resolution import resolve_night, resolve_day
+from tests.factories import room_state
+
+
+KILL, SAVE, INVESTIGATE, NONE = ActionType.KILL, ActionType.SAVE, ActionType.INVESTIGATE, ActionType.NO_ACTION
+
+
+def test_kill_removes_the_target():
+    state = room_state([KILL, SAVE, INVESTIGATE, NONE, NONE], mafia_seats=(0,))
+    state.actions[0] = (KILL, 3)
+
+    result = resolve_night(state)
+
+    assert result.deaths == [104]
+    assert not state.is_alive(3)
+    assert state.alive_count == 4
+
+
+def test_save_on_the_target_prevents_the_kill():
+    state = room_state([KILL, SAVE, NONE, NONE], mafia_seats=(0,))
+    state.actions[0] = (KILL, 2)
+    state.actions[1] = (SAVE, 2)
+
+    result = resolve_night(state)
+
+    assert result.deaths == []
+    assert state.is_alive(2)
+
+
+def test_save_on_someone_else_does_not_prevent_the_kill():
+    state = room_state([KILL, SAVE, NONE, NONE], mafia_seats=(0,))
+    state.actions[0] = (KILL, 2)
+    state.actions[1] = (SAVE, 3)
+
+    assert resolve_night(state).deaths == [103]
+
+
+def test_night_without_actions_kills_nobody():
+    state = room_state([KILL, SAVE, INVESTIGATE, NONE], mafia_seats=(0,))
+
+    result = resolve_night(state)
+
+    assert result.deaths == []
+    assert result.investigations == {}
+    assert state.alive_count == 4
+
+
+def test_mafia_kill_is_decided_by_plurality():
+    state = room_state([KILL, KILL, KILL, NONE, NONE, NONE], mafia_seats=(0, 1, 2))
+    state.actions[0] = (KILL, 4)
+    state.actions[1] = (KILL, 5)
+    state.actions[2] = (KILL, 5)
+
+    assert resolve_night(state).deaths == [106]
+
+
+def test_tied_mafia_kill_votes_kill_nobody():
+    state = room_state([KILL, KILL, NONE, NONE, NONE], mafia_seats=(0, 1))
+    state.actions[0] = (KILL, 3)
+    state.actions[1] = (KILL, 4)
+
+    assert resolve_night(state).deaths == []
+    assert state.alive_count == 5
+
+
+def test_investigation_reports_whether_the_target_is_mafia():
+    state = room_state([KILL, INVESTIGATE, NONE, NONE], mafia_seats=(0,))
+    state.actions[1] = (INVESTIGATE, 0)
+
+    result = resolve_night(state)
+
+    assert result.investigations == {102: (101, True)}
+
+    state.actions[1] = (INVESTIGATE, 2)
+    assert resolve_night(state).investigations == {102: (103, False)}
+
+
+def test_day_lynches_the_single_leader():
+    state = room_state([KILL, NONE, NONE, NONE], mafia_seats=(0,))
+    state.tally.cast(1, 0)
+    state.tally.cast(2, 0)
+    state.tally.cast(3, 1)
+
+    assert resolve_day(state).deaths == [101]
+    assert not state.is_alive(0)
+
+
+def test_tied_day_vote_lynches_nobody():
+    state = room_state([KILL, NONE, NONE, NONE], mafia_seats=(0,))
+    state.tally.cast(0, 1)
+    state.tally.cast(1, 0)
+
+    assert resolve_day(state).deaths == []
+    assert state.alive_count == 4
@@ -0,0 +1,109 @@
+from collections import Counter
+import pytest
+from src.game.enums import ActionType
+from src.game.roles import RoleAssigner, compose_roles
+from src.game.schemas import RoolSetResponse, GameRoleResponse
+
+
+MAFIA, SHERIFF, DOCTOR, CIVILIAN = 1, 2, 3, 4
+
+
+def rool_set(mafia_percent: int = 25, allow_sheriff: bool = True, extra_roles=(), civilian: bool = True):
+    game_roles = [
+        GameRoleResponse(id=MAFIA, name='mafia', is_mafia=True, is_special=False),
+        GameRoleResponse(id=SHERIFF, name='Sheriff', is_mafia=False, is_special=True),
+        GameRoleResponse(id=DOCTOR, name='doctor', is_mafia=False, is_special=True),
+        *extra_roles,
+    ]
+    if civilian:
+        game_roles.append(GameRoleResponse(id=CIVILIAN, name='civilian', is_mafia=False, is_special=False))
+    return RoolSetResponse(
+        id=1,
+        name='classic',
+        mafia_percent=mafia_percent,
+        allow_sheriff=allow_sheriff,
+        day_duration_minutes=10,
+        night_duration_minutes=5,
+        game_roles=game_roles
+    )
+
+
+@pytest.mark.parametrize('mafia_percent, player_count, mafia_count', [
+    (25, 8, 2),
+    (25, 20, 5),
+    (0, 6, 1),
+    (10, 4, 1),
+    (100, 4, 1),
+    (100, 10, 4),
+    (50, 9, 4),
+])
+def test_mafia_count_is_clamped(mafia_percent, player_count, mafia_count):
+    composition = compose_roles(rool_set(mafia_percent), player_count)
+
+    assert len(composition) == player_count
+    assert [slot for slot in composition if slot[1]] == [(MAFIA, True, ActionType.KILL)] * mafia_count
+
+
+def test_sheriff_is_left_out_when_not_allowed():
+    allowed = Counter(role_id for role_id, _, _ in compose_roles(rool_set(), 8))
+    not_allowed = Counter(role_id for role_id, _, _ in compose_roles(rool_set(allow_sheriff=False), 8))
+
+    assert allowed == {MAFIA: 2, SHERIFF: 1, DOCTOR: 1, CIVILIAN: 4}
+    assert not_allowed == {MAFIA: 2, DOCTOR: 1, CIVILIAN: 5}
+
+
+def test_special_roles_are_capped_by_the_free_seats():
+    extra = [GameRoleResponse(id=10 + index, name=f'special {index}', is_mafia=False, is_special=True) for index in range(4)]
+
+    composition = compose_roles(rool_set(extra_roles=extra), 4)
+
+    assert [role_id for role_id, _, _ in composition] == [MAFIA, SHERIFF, DOCTOR, 10]
+    assert [ability for _, _, ability in composition] == [
+        ActionType.KILL, ActionType.INVESTIGATE, ActionType.SAVE, ActionType.NO_ACTION
+    ]
+
+
+def test_remaining_seats_are_civilians_even_without_a_civilian_role():
+    composition = compose_roles(rool_set(civilian=False), 6)
+
+    assert composition[3:] == ((None, False, ActionType.NO_ACTION),) * 3
+
+
+def test_compositions_are_reused_until_the_rool_set_changes():
+    assigner = RoleAssigner(0)
+    rules = rool_set()
+
+    table = assigner.compositions(rules)
+
+    assert assigner.compositions(rules) is table
+    assert assigner.compositions(rool_set()) is not table
+    assert table[12] == compose_roles(rules, 12)
+
+
+def test_assignment_shuffles_the_composition():
+    rules = rool_set()
+    assignment = RoleAssigner(7).assign(rules, 12)
+
+    assert Counter(assignment.roles) == Counter(role_id for role_id, _, _ in compose_roles(rules, 12))
+    assert assignment.mafia.bit_count() == 3
+    for seat, role_id in enumerate(assignment.roles):
+        assert bool(assignment.mafia >> seat & 1) == (role_id == MAFIA)
+        assert (assignment.abilities[seat] == ActionType.KILL) == (role_id == MAFIA)
+
+
+def test_same_seed_gives_the_same_assignments():
+    rules = rool_set()
+    first, second = RoleAssigner(42), RoleAssigner(42)
+
+    assert [first.assign(rules, 10).roles for _ in range(5)] == [second.assign(rules, 10).roles for _ in range(5)]
+
+
+def test_batch_matches_single_assignments_under_the_same_seed():
+    rooms = [(rool_set(), player_count) for player_count in (4, 8, 12, 16, 20)]
+    rooms.append((rool_set(allow_sheriff=False, mafia_percent=50), 9))
+
+    batch = RoleAssigner(3).assign_many(rooms)
+    single = RoleAssigner(3)
+    singles = [single.assign(rules, player_count) for rules, player_count in rooms]
+
+    assert [(a.roles, a.abilities, a.mafia) for a in batch] == [(a.roles, a.abilities, a.mafia) for a in singles]
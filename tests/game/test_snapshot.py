@@ -0,0 +1,135 @@
+import random
+import time
+import pytest
+from src.game.engine import game_engine
+from src.game.enums import ActionType, GamePhase, GameWinner
+from src.game.scheduler import phase_scheduler
+from src.game.service import GameService
+from src.game.snapshot import encode_state, decode_state, save_snapshots, load_snapshots, SNAPSHOT_VERSION
+from src.game.state import RoomState
+from src.game.models import GameSnapshot
+from tests.factories import create_user, create_rool_set, create_room, room_state
+
+
+def random_state(rng: random.Random) -> RoomState:
+    player_count = rng.randint(4, 20)
+    abilities = [rng.choice(list(ActionType)) for _ in range(player_count)]
+    state = room_state(abilities, mafia_seats=tuple(rng.sample(range(player_count), rng.randint(1, player_count // 3))))
+    state.room_id = rng.randrange(1, 2 ** 31)
+    state.rool_set_id = rng.randrange(1, 1000)
+    state.roles = [rng.choice([None, 1, 2, 3]) for _ in range(player_count)]
+    state.phase = rng.choice([GamePhase.NIGHT, GamePhase.DAY])
+    state.winner = rng.choice([None, *GameWinner])
+    state.round = rng.randrange(1, 100)
+    state.deadline = rng.uniform(1.7e9, 1.8e9)
+    state.alive = rng.getrandbits(player_count)
+    for seat in rng.sample(range(player_count), rng.randint(0, player_count)):
+        state.actions[seat] = (abilities[seat], rng.randrange(player_count))
+    for voter in rng.sample(range(player_count), rng.randint(0, player_count)):
+        state.tally.cast(voter, rng.randrange(player_count))
+    state.tally.pop_changes()
+    return state
+
+
+def assert_same_state(restored: RoomState, state: RoomState):
+    for name in RoomState.__slots__:
+        if name != 'tally':
+            assert getattr(restored, name) == getattr(state, name), name
+    assert restored.tally.votes == state.tally.votes
+    assert restored.tally.counts == state.tally.counts
+    assert restored.tally.leader() == state.tally.leader()
+    assert restored.tally.pop_changes() == {}
+
+
+def test_random_rooms_round_trip():
+    rng = random.Random(16)
+    for _ in range(200):
+        state = random_state(rng)
+        assert_same_state(decode_state(encode_state(state)), state)
+
+
+def test_dead_players_and_empty_actions_round_trip():
+    state = room_state([ActionType.KILL, ActionType.SAVE, ActionType.NO_ACTION, ActionType.NO_ACTION], mafia_seats=(0,))
+    state.alive = 0b0101
+    state.deadline = time.time() + 30
+
+    restored = decode_state(encode_state(state))
+
+    assert_same_state(restored, state)
+    assert restored.actions == {}
+    assert len(restored.tally) == 0
+    assert restored.alive_user_ids() == [101, 103]
+
+
+def test_other_versions_are_rejected():
+    data = bytearray(encode_state(random_state(random.Random(1))))
+    data[0] = SNAPSHOT_VERSION + 1
+
+    with pytest.raises(ValueError, match='version'):
+        decode_state(bytes(data))
+    with pytest.raises(ValueError):
+        decode_state(b'')
+
+
+def test_truncated_and_padded_snapshots_are_rejected():
+    data = encode_state(random_state(random.Random(2)))
+
+    for length in range(1, len(data)):
+        with pytest.raises(ValueError):
+            decode_state(data[:length])
+    with pytest.raises(ValueError):
+        decode_state(data + b'\0')
+
+
+def test_out_of_range_values_are_rejected():
+    state = room_state([ActionType.KILL, ActionType.NO_ACTION, ActionType.NO_ACTION, ActionType.NO_ACTION])
+    state.actions[0] = (ActionType.KILL, 3)
+    data = bytearray(encode_state(state))
+
+    corrupt_target = bytearray(data)
+    corrupt_target[-1] = 4
+    with pytest.raises(ValueError):
+        decode_state(bytes(corrupt_target))
+
+    corrupt_phase = bytearray(data)
+    corrupt_phase[1] = 200
+    with pytest.raises(ValueError):
+        decode_state(bytes(corrupt_phase))
+
+
+@pytest.mark.anyio
+async def test_restore_fires_deadlines_that_passed_while_down(db):
+    user = await create_user(db)
+    rool_set = await create_rool_set(db)
+    room = await create_room(db, user, rool_set)
+    state = room_state([ActionType.KILL, ActionType.NO_ACTION, ActionType.NO_ACTION, ActionType.NO_ACTION])
+    state.room_id = room.id
+    state.join_code = str(room.join_code)
+    state.deadline = time.time() - 120
+    await save_snapshots([state], db)
+    await db.commit()
+
+    try:
+        assert await GameService.restore(db) == 1
+        restored = game_engine.get(state.join_code)
+        assert_same_state(restored, state)
+        assert state.join_code in phase_scheduler._pop_due(time.time())
+    finally:
+        game_engine.remove(state.join_code)
+        phase_scheduler.cancel(state.join_code)
+
+
+@pytest.mark.anyio
+async def test_unreadable_snapshots_are_skipped_on_load(db):
+    user = await create_user(db)
+    rool_set = await create_rool_set(db)
+    good, bad = await create_room(db, user, rool_set), await create_room(db, user, rool_set)
+    state = room_state([ActionType.KILL, ActionType.NO_ACTION, ActionType.NO_ACTION, ActionType.NO_ACTION])
+    state.room_id = good.id
+    await save_snapshots([state], db)
+    db.add(GameSnapshot(room_id=bad.id, data=encode_state(state)[:10]))
+    await db.commit()
+
+    states = await load_snapshots(db)
+
+    assert [restored.room_id for restored in states] == [good.id]
@@ -0,0 +1,130 @@
+import random
+from collections import Counter
+import pytest
+from src.game.engine import GameEngine
+from src.game.enums import ActionType, GamePhase
+from src.game.exceptions import GameActionException
+from src.game.votes import VoteTally
+from tests.factories import room_state
+
+
+def expected_leader(votes: dict[int, int]) -> int | None:
+    counts = Counter(votes.values()).most_common()
+    if not counts or len(counts) > 1 and counts[0][1] == counts[1][1]:
+        return None
+    return counts[0][0]
+
+
+def test_changed_vote_moves_to_the_new_target():
+    tally = VoteTally()
+    tally.cast(0, 1)
+    tally.cast(2, 1)
+    tally.cast(0, 3)
+
+    assert tally.counts == {1: 1, 3: 1}
+    assert tally.leader() is None
+    assert len(tally) == 2
+
+    tally.cast(2, 3)
+    assert tally.counts == {3: 2}
+    assert tally.leader() == 3
+
+
+def test_repeated_vote_is_counted_once():
+    tally = VoteTally()
+    tally.cast(0, 1)
+    tally.pop_changes()
+    tally.cast(0, 1)
+
+    assert tally.counts == {1: 1}
+    assert tally.pop_changes() == {}
+
+
+def test_retracted_vote_is_removed():
+    tally = VoteTally()
+    tally.cast(0, 1)
+    tally.cast(2, 1)
+    tally.retract(0)
+    tally.retract(4)
+
+    assert tally.counts == {1: 1}
+    assert tally.max_count == 1
+
+    tally.retract(2)
+    assert tally.counts == {}
+    assert tally.leader() is None
+    assert tally.max_count == 0
+
+
+def test_tie_has_no_leader_until_broken():
+    tally = VoteTally()
+    tally.cast(0, 1)
+    tally.cast(1, 0)
+    assert tally.leader() is None
+
+    tally.cast(2, 0)
+    assert tally.leader() == 0
+
+    tally.retract(2)
+    assert tally.leader() is None
+    assert tally.max_count == 1
+
+
+def test_majority_needs_more_than_half_of_the_voters():
+    tally = VoteTally()
+    tally.cast(0, 4)
+    tally.cast(1, 4)
+
+    assert not tally.has_majority(4)
+    assert tally.has_majority(3)
+
+
+def test_changes_are_coalesced_to_the_latest_counts():
+    tally = VoteTally()
+    tally.cast(0, 1)
+    tally.cast(2, 1)
+    tally.cast(0, 3)
+    tally.retract(2)
+
+    assert tally.pop_changes() == {1: 0, 3: 1}
+    assert tally.pop_changes() == {}
+
+
+def test_matches_a_recount_after_random_operations():
+    rng = random.Random(7)
+    tally = VoteTally()
+    votes = {}
+    for _ in range(5000):
+        voter = rng.randrange(12)
+        if rng.random() < 0.2:
+            tally.retract(voter)
+            votes.pop(voter, None)
+        else:
+            target = rng.randrange(12)
+            tally.cast(voter, target)
+            votes[voter] = target
+
+        recount = Counter(votes.values())
+        assert tally.counts == recount
+        assert tally.max_count == max(recount.values(), default=0)
+        assert tally.leader() == expected_leader(votes)
+
+
+def test_dead_players_cannot_vote_or_be_voted_for():
+    engine = GameEngine()
+    state = room_state([ActionType.KILL, *[ActionType.NO_ACTION] * 4], mafia_seats=(0,), phase=GamePhase.DAY)
+    state.alive &= ~(1 << 4)
+
+    with pytest.raises(GameActionException):
+        engine.cast_vote(state, 105, 101)
+    with pytest.raises(GameActionException):
+        engine.cast_vote(state, 101, 105)
+    assert len(state.tally) == 0
+
+    engine.cast_vote(state, 102, 101)
+    engine.cast_vote(state, 103, 101)
+    assert not engine.voting_complete(state)
+
+    engine.cast_vote(state, 104, 101)
+    assert engine.voting_complete(state)
+    assert state.tally.leader() == 0
@@ -0,0 +1,63 @@
+import subprocess
+import sys
+import pytest
+from src.ratelimit import MemoryRateLimiter, RateLimiter, RateLimit, TooManyRequestsException
+from src.user import utils
+
+
+pytestmark = pytest.mark.anyio
+
+
+def test_module_imports_on_its_own():
+    subprocess.run([sys.executable, '-c', 'import src.ratelimit'], check=True)
+
+
+def test_backends_must_implement_hit():
+    with pytest.raises(TypeError):
+        RateLimiter()
+
+
+async def test_empty_bucket_is_rejected_with_retry_after():
+    limiter = MemoryRateLimiter(max_keys=10)
+    limit = RateLimit('test', per_minute=6, burst=2)
+    await limiter.check(limit, 'key')
+    await limiter.check(limit, 'key')
+
+    with pytest.raises(TooManyRequestsException) as exc_info:
+        await limiter.check(limit, 'key')
+
+    assert exc_info.value.headers['Retry-After'] == '10'
+    assert limiter.rejected == 1
+    await limiter.check(limit, 'other key')
+
+
+async def test_failed_logins_from_one_ip_do_not_lock_the_user_out_elsewhere(monkeypatch):
+    monkeypatch.setattr(utils, 'rate_limiter', MemoryRateLimiter(max_keys=100))
+    monkeypatch.setattr(utils, 'LOGIN_PER_IP', RateLimit('login:ip', per_minute=1, burst=100))
+
+    with pytest.raises(TooManyRequestsException):
+        for _ in range(100):
+            await utils.check_login_rate('Victim', '10.0.0.66')
+
+    await utils.check_login_rate('victim', '10.0.0.1')
+
+
+async def test_failed_logins_over_many_ips_are_limited_per_username(monkeypatch):
+    monkeypatch.setattr(utils, 'rate_limiter', MemoryRateLimiter(max_keys=1000))
+    monkeypatch.setattr(utils, 'LOGIN_FAILURES_PER_USERNAME', RateLimit('login:username', per_minute=1, burst=20))
+
+    for address in range(20):
+        await utils.check_login_rate('victim', f'10.0.1.{address}')
+        await utils.record_login_failure('Victim')
+
+    with pytest.raises(TooManyRequestsException):
+        await utils.check_login_rate('victim', '10.0.2.1')
+    await utils.check_login_rate('someone else', '10.0.2.1')
+
+
+async def test_checking_alone_does_not_spend_failures(monkeypatch):
+    monkeypatch.setattr(utils, 'rate_limiter', MemoryRateLimiter(max_keys=1000))
+    monkeypatch.setattr(utils, 'LOGIN_FAILURES_PER_USERNAME', RateLimit('login:username', per_minute=1, burst=2))
+
+    for address in range(50):
+        await utils.check_login_rate('victim', f'10.0.1.{address}')
@@ -0,0 +1,159 @@
+from collections import Counter
+from uuid import uuid4
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, JSONResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from src.middleware import ShardingMiddleware, ROOM_CLOSE_REDIRECT, MAX_CLOSE_REASON_BYTES, redirect_reason
+from src.sharding import HashRing, ShardMap, ShardProxy
+
+
+KEYS = [str(uuid4()) for _ in range(5000)]
+
+
+def test_owner_is_deterministic_and_independent_of_node_order():
+    ring = HashRing(['a', 'b', 'c'], 64)
+    shuffled = HashRing(['c', 'a', 'b', 'a'], 64)
+
+    assert [ring.owner(key) for key in KEYS] == [shuffled.owner(key) for key in KEYS]
+    assert HashRing([], 64).owner(KEYS[0]) is None
+
+
+def test_keys_are_spread_over_every_node():
+    ring = HashRing(['a', 'b', 'c', 'd'], 128)
+
+    placement = Counter(ring.owner(key) for key in KEYS)
+
+    assert set(placement) == {'a', 'b', 'c', 'd'}
+    assert min(placement.values()) > len(KEYS) / 4 * 0.7
+
+
+def test_adding_a_node_only_moves_keys_to_it():
+    before = HashRing(['a', 'b', 'c'], 128)
+    after = HashRing(['a', 'b', 'c', 'd'], 128)
+
+    moved = [key for key in KEYS if before.owner(key) != after.owner(key)]
+
+    assert all(after.owner(key) == 'd' for key in moved)
+    assert len(KEYS) / 4 * 0.7 < len(moved) < len(KEYS) / 4 * 1.3
+
+
+def test_removing_a_node_only_moves_its_keys():
+    before = HashRing(['a', 'b', 'c'], 128)
+    after = HashRing(['a', 'c'], 128)
+
+    assert all(after.owner(key) == before.owner(key) for key in KEYS if before.owner(key) != 'b')
+
+
+async def owner_echo(request):
+    return JSONResponse({
+        'method': request.method,
+        'url': str(request.url),
+        'authorization': request.headers.get('authorization'),
+        'forwarded': request.headers.get('x-shard-forwarded'),
+        'body': (await request.body()).decode(),
+    }, status_code=201, headers={'x-owner': 'b'})
+
+
+@pytest.fixture
+def client(monkeypatch):
+    shard_map = ShardMap('a', {'a': 'http://a.local:8000', 'b': 'https://b.local'}, 64)
+    monkeypatch.setattr('src.middleware.shard_map', shard_map)
+    owner = Starlette(routes=[Route('/rooms/{join_code}/{name}', owner_echo, methods=['GET', 'POST'])])
+    monkeypatch.setattr('src.middleware.shard_proxy', ShardProxy('a', 5, transport=httpx.ASGITransport(owner)))
+
+    async def room(request):
+        return PlainTextResponse('local')
+
+    async def room_socket(websocket):
+        await websocket.accept()
+        await websocket.send_text('local')
+        await websocket.close()
+
+    app = Starlette(routes=[
+        Route('/rooms/{join_code}', room, methods=['GET', 'POST']),
+        Route('/rooms/{join_code}/{name}', room, methods=['GET', 'POST']),
+        WebSocketRoute('/rooms/{join_code}/ws', room_socket),
+    ])
+    with TestClient(ShardingMiddleware(app)) as client:
+        client.shard_map = shard_map
+        yield client
+
+
+def code_owned_by(shard_map: ShardMap, node: str) -> str:
+    return next(key for key in KEYS if shard_map.owner(key) == node)
+
+
+def test_local_rooms_are_served(client):
+    join_code = code_owned_by(client.shard_map, 'a')
+
+    assert client.get(f'/rooms/{join_code}/game').text == 'local'
+    with client.websocket_connect(f'/rooms/{join_code}/ws') as websocket:
+        assert websocket.receive_text() == 'local'
+
+
+def test_rooms_without_live_state_are_served_by_any_worker(client):
+    join_code = code_owned_by(client.shard_map, 'b')
+
+    assert client.get(f'/rooms/{join_code}').text == 'local'
+    assert client.post(f'/rooms/{join_code}').text == 'local'
+
+
+def test_live_state_requests_are_forwarded_to_the_owner(client):
+    join_code = code_owned_by(client.shard_map, 'b').upper()
+
+    response = client.post(
+        f'/rooms/{join_code}/votes?limit=5',
+        json={'target_id': 3},
+        headers={'Authorization': 'Bearer token'}
+    )
+
+    assert response.status_code == 201
+    assert response.headers['x-owner'] == 'b'
+    assert response.json() == {
+        'method': 'POST',
+        'url': f'https://b.local/rooms/{join_code}/votes?limit=5',
+        'authorization': 'Bearer token',
+        'forwarded': 'a',
+        'body': '{"target_id":3}',
+    }
+
+
+def test_forwarded_requests_are_not_forwarded_again(client):
+    join_code = code_owned_by(client.shard_map, 'b')
+
+    response = client.get(f'/rooms/{join_code}/game', headers={'x-shard-forwarded': 'c'})
+
+    assert response.text == 'local'
+
+
+def test_unreachable_owner_is_a_bad_gateway(client, monkeypatch):
+    def refuse(request):
+        raise httpx.ConnectError('connection refused', request=request)
+
+    monkeypatch.setattr('src.middleware.shard_proxy', ShardProxy('a', 5, transport=httpx.MockTransport(refuse)))
+    join_code = code_owned_by(client.shard_map, 'b')
+
+    assert client.get(f'/rooms/{join_code}/game').status_code == 502
+
+
+def test_websocket_is_closed_with_the_owner_url_without_the_query(client):
+    join_code = code_owned_by(client.shard_map, 'b')
+
+    with client.websocket_connect(f'/rooms/{join_code}/ws?token=secret') as websocket:
+        with pytest.raises(WebSocketDisconnect) as disconnect:
+            websocket.receive_text()
+
+    assert disconnect.value.code == ROOM_CLOSE_REDIRECT
+    assert disconnect.value.reason == f'wss://b.local/rooms/{join_code}/ws'
+
+
+def test_redirect_reason_fits_a_close_frame():
+    long_url = 'wss://' + 'b' * 100 + '.local'
+
+    assert redirect_reason('wss://b.local', '/rooms/x/ws') == 'wss://b.local/rooms/x/ws'
+    assert redirect_reason(long_url, '/rooms/' + 'x' * 36 + '/ws') == long_url
+    assert len(redirect_reason(long_url * 2, '/ws').encode()) == MAX_CLOSE_REASON_BYTES
@@ -0,0 +1,45 @@
+import pytest
+from src.user.cache import user_cache, CachedUser
+from tests.factories import create_user
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_entry_is_dropped_when_the_update_commits(db):
+    user = await create_user(db)
+    user_cache.set(user)
+
+    user.email = 'changed@example.com'
+    await db.flush()
+    assert user_cache.get(user.username) is not None
+
+    await db.commit()
+    assert user_cache.get(user.username) is None
+
+
+async def test_rolled_back_update_keeps_the_entry(db):
+    user = await create_user(db)
+    username = user.username
+    user_cache.set(user)
+
+    user.email = 'changed@example.com'
+    await db.flush()
+    await db.rollback()
+    await db.commit()
+
+    assert isinstance(user_cache.get(username), CachedUser)
+
+
+async def test_renamed_and_deleted_users_are_dropped(db):
+    renamed, deleted = await create_user(db), await create_user(db)
+    old_username = renamed.username
+    user_cache.set(renamed)
+    user_cache.set(deleted)
+
+    renamed.username = 'renamed'
+    await db.delete(deleted)
+    await db.commit()
+
+    assert user_cache.get(old_username) is None
+    assert user_cache.get(deleted.username) is None